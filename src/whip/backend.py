@@ -0,0 +1,40 @@
+"""Interface shared by the input injection backends.
+
+This module defines the InputBackend protocol implemented by InputController
+(pynput/Quartz) and NullController (load testing). Code that only drives a
+backend depends on this protocol, so it type-checks against either one and
+stays importable without the macOS-only dependencies.
+"""
+
+from typing import Protocol
+
+
+class InputBackend(Protocol):
+    """Mouse and keyboard injection with normalized (0.0-1.0) coordinates."""
+
+    _screen_width: int
+    _screen_height: int
+
+    def move_mouse(self, norm_x: float, norm_y: float) -> None:
+        """Move the cursor to normalized coordinates."""
+        ...
+
+    def get_position(self) -> tuple[float, float]:
+        """Get the cursor position as normalized coordinates."""
+        ...
+
+    def mouse_down(self, button: str, x: float | None, y: float | None) -> None:
+        """Press a mouse button, moving first unless the coordinates are None."""
+        ...
+
+    def mouse_up(self, button: str, x: float | None, y: float | None) -> None:
+        """Release a mouse button, moving first unless the coordinates are None."""
+        ...
+
+    def key_down(self, key: str, code: str) -> None:
+        """Press a key."""
+        ...
+
+    def key_up(self, key: str, code: str) -> None:
+        """Release a key."""
+        ...
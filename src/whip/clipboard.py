@@ -0,0 +1,348 @@
+"""Chunked, out-of-band clipboard synchronization.
+
+This module moves clipboard contents (text and PNG images) between the browser
+and the host over a dedicated WebSocket, separate from the input socket, so
+large transfers never queue up in front of mouse and keyboard events.
+
+A transfer is a JSON clipboard_begin frame, the payload as binary frames of
+at most CHUNK_SIZE bytes, and a JSON clipboard_end frame. Payloads may be
+gzip-compressed. Sizes are checked against MAX_CLIPBOARD_BYTES while chunks
+arrive and again during decompression, so oversized or malicious transfers
+are rejected early.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+import zlib
+from typing import TYPE_CHECKING, Any, Protocol
+
+from whip.protocol import MessageType, create_message
+
+if TYPE_CHECKING:
+    from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_MIME_TYPES = frozenset({"text/plain", "image/png"})
+SUPPORTED_ENCODINGS = frozenset({"identity", "gzip"})
+MAX_CLIPBOARD_BYTES = 16 * 1024 * 1024  # 16 MiB after decompression
+CHUNK_SIZE = 256 * 1024  # Binary frame size for outgoing transfers
+COMPRESS_THRESHOLD = 1024  # Smaller payloads are sent uncompressed
+
+
+class ClipboardError(ValueError):
+    """Raised when a clipboard transfer is invalid or exceeds limits."""
+
+
+class ClipboardBackend(Protocol):
+    """Host clipboard access used by ClipboardSync."""
+
+    def change_count(self) -> int:
+        """Return a counter that changes whenever the clipboard changes."""
+        ...
+
+    def read(self) -> tuple[str, bytes] | None:
+        """Return (mime, data) for the current clipboard, or None if unsupported."""
+        ...
+
+    def write(self, mime: str, data: bytes) -> None:
+        """Replace the clipboard contents."""
+        ...
+
+
+class PasteboardClipboard:
+    """macOS general pasteboard via AppKit (PyObjC).
+
+    AppKit is imported lazily, like the pynput controller, so the module can
+    be loaded on platforms without PyObjC.
+    """
+
+    def __init__(self) -> None:
+        """Bind to the general pasteboard."""
+        from AppKit import NSPasteboard  # type: ignore[reportMissingImports]
+
+        self._pasteboard = NSPasteboard.generalPasteboard()
+
+    def change_count(self) -> int:
+        """Return the pasteboard change count."""
+        return int(self._pasteboard.changeCount())
+
+    def read(self) -> tuple[str, bytes] | None:
+        """Read PNG image data if present, otherwise plain text."""
+        from AppKit import NSPasteboardTypePNG, NSPasteboardTypeString  # type: ignore[reportMissingImports]
+
+        data = self._pasteboard.dataForType_(NSPasteboardTypePNG)
+        if data is not None:
+            return "image/png", bytes(data)
+        text = self._pasteboard.stringForType_(NSPasteboardTypeString)
+        if text is not None:
+            return "text/plain", str(text).encode("utf-8")
+        return None
+
+    def write(self, mime: str, data: bytes) -> None:
+        """Replace the pasteboard contents with text or PNG data."""
+        from AppKit import NSPasteboardTypePNG, NSPasteboardTypeString  # type: ignore[reportMissingImports]
+        from Foundation import NSData  # type: ignore[reportMissingImports]
+
+        self._pasteboard.clearContents()
+        if mime == "text/plain":
+            self._pasteboard.setString_forType_(data.decode("utf-8"), NSPasteboardTypeString)
+        else:
+            self._pasteboard.setData_forType_(NSData.dataWithBytes_length_(data, len(data)), NSPasteboardTypePNG)
+
+
+class MemoryClipboard:
+    """In-memory clipboard used with the null input backend."""
+
+    def __init__(self) -> None:
+        """Initialize an empty clipboard."""
+        self._contents: tuple[str, bytes] | None = None
+        self._change_count = 0
+
+    def change_count(self) -> int:
+        """Return the number of writes so far."""
+        return self._change_count
+
+    def read(self) -> tuple[str, bytes] | None:
+        """Return the last written contents."""
+        return self._contents
+
+    def write(self, mime: str, data: bytes) -> None:
+        """Store new contents."""
+        self._contents = (mime, data)
+        self._change_count += 1
+
+
+class ClipboardTransfer:
+    """Reassembles one incoming chunked clipboard transfer."""
+
+    def __init__(self, transfer_id: str, mime: object, size: object, encoding: object,
+                 max_bytes: int = MAX_CLIPBOARD_BYTES) -> None:
+        """Validate transfer metadata.
+
+        Metadata comes straight from client JSON, so every field is type-checked.
+
+        Args:
+            transfer_id: Sender-chosen transfer identifier
+            mime: Payload type ("text/plain" or "image/png")
+            size: Payload size in bytes after decoding
+            encoding: "identity" or "gzip"
+            max_bytes: Maximum decoded (and encoded) payload size
+
+        Raises:
+            ClipboardError: If the metadata is invalid or exceeds limits
+        """
+        if not isinstance(mime, str) or mime not in SUPPORTED_MIME_TYPES:
+            raise ClipboardError(f"Unsupported clipboard type: {mime!r}")
+        if not isinstance(encoding, str) or encoding not in SUPPORTED_ENCODINGS:
+            raise ClipboardError(f"Unsupported encoding: {encoding!r}")
+        if not isinstance(size, int) or isinstance(size, bool) or not 0 <= size <= max_bytes:
+            raise ClipboardError(f"Clipboard size {size!r} exceeds limit of {max_bytes} bytes")
+
+        self.id = transfer_id
+        self.mime = mime
+        self.size = size
+        self.encoding = encoding
+        self._max_bytes = max_bytes
+        self._chunks: list[bytes] = []
+        self._received = 0
+
+    def add_chunk(self, chunk: bytes) -> None:
+        """Append a received chunk, enforcing the size limit."""
+        self._received += len(chunk)
+        if self._received > self._max_bytes:
+            raise ClipboardError(f"Clipboard transfer exceeds limit of {self._max_bytes} bytes")
+        self._chunks.append(chunk)
+
+    def finish(self) -> bytes:
+        """Join and decode the payload (runs in an executor for large transfers).
+
+        Raises:
+            ClipboardError: If decoding fails or the size does not match
+        """
+        payload = b"".join(self._chunks)
+        self._chunks = []
+        if self.encoding == "gzip":
+            decompressor = zlib.decompressobj(wbits=31)
+            try:
+                # Bounded so a small compressed payload cannot expand without limit
+                payload = decompressor.decompress(payload, self._max_bytes + 1)
+            except zlib.error as e:
+                raise ClipboardError(f"Invalid gzip payload: {e}") from e
+            if decompressor.unconsumed_tail or not decompressor.eof:
+                raise ClipboardError("Clipboard payload is truncated or exceeds the size limit")
+        if len(payload) != self.size:
+            raise ClipboardError(f"Clipboard size mismatch: expected {self.size}, got {len(payload)}")
+        return payload
+
+
+def encode_payload(data: bytes) -> tuple[str, bytes]:
+    """Compress a payload with gzip when it is large enough to benefit.
+
+    Returns:
+        Tuple of (encoding, encoded bytes)
+    """
+    if len(data) < COMPRESS_THRESHOLD:
+        return "identity", data
+    compressor = zlib.compressobj(level=6, wbits=31)
+    compressed = compressor.compress(data) + compressor.flush()
+    # PNG data is already compressed; keep whichever is smaller
+    if len(compressed) >= len(data):
+        return "identity", data
+    return "gzip", compressed
+
+
+class ClipboardSync:
+    """Serves the clipboard WebSocket channel and pushes host clipboard changes.
+
+    Incoming transfers are written to the host clipboard. Host clipboard
+    changes (detected by polling the change count) are pushed to every
+    connected clipboard client. Compression, decompression and pasteboard
+    access run in a thread executor to keep the event loop free for input.
+    """
+
+    def __init__(self, backend: ClipboardBackend, max_bytes: int = MAX_CLIPBOARD_BYTES,
+                 chunk_size: int = CHUNK_SIZE, poll_interval: float = 1.0) -> None:
+        """Initialize clipboard sync.
+
+        Args:
+            backend: Host clipboard access
+            max_bytes: Maximum clipboard payload size in bytes
+            chunk_size: Binary frame size for outgoing transfers
+            poll_interval: Seconds between host clipboard change checks
+        """
+        self._backend = backend
+        self._max_bytes = max_bytes
+        self._chunk_size = chunk_size
+        self._poll_interval = poll_interval
+        self._clients: set["WebSocket"] = set()
+        self._last_change: int | None = None
+        # Held across our own write and the change-count poll, so the poller
+        # never sees our write before _last_change records it
+        self._change_lock = asyncio.Lock()
+
+    async def handle(self, websocket: "WebSocket") -> None:
+        """Serve one clipboard WebSocket until it disconnects."""
+        self._clients.add(websocket)
+        transfer: ClipboardTransfer | None = None
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                if message.get("bytes") is not None:
+                    if transfer is None:
+                        await self._send_error(websocket, None, "Chunk received outside a transfer")
+                        continue
+                    try:
+                        transfer.add_chunk(message["bytes"])
+                    except ClipboardError as e:
+                        await self._send_error(websocket, transfer.id, str(e))
+                        transfer = None
+                    continue
+
+                try:
+                    frame = json.loads(message.get("text") or "")
+                    msg_type = frame.get("type")
+                    data = frame.get("data", {})
+                    if not isinstance(data, dict):
+                        raise ValueError("data must be an object")
+                except (ValueError, AttributeError):
+                    await self._send_error(websocket, None, "Invalid clipboard frame")
+                    continue
+
+                if msg_type == MessageType.CLIPBOARD_BEGIN:
+                    try:
+                        transfer = ClipboardTransfer(
+                            str(data.get("id", "")), data.get("mime"), data.get("size"),
+                            data.get("encoding", "identity"), self._max_bytes,
+                        )
+                    except ClipboardError as e:
+                        await self._send_error(websocket, data.get("id"), str(e))
+                        transfer = None
+                elif msg_type == MessageType.CLIPBOARD_END:
+                    if transfer is None or data.get("id") != transfer.id:
+                        await self._send_error(websocket, data.get("id"), "No matching transfer")
+                        continue
+                    completed, transfer = transfer, None
+                    await self._apply(websocket, completed)
+                elif msg_type == MessageType.CLIPBOARD_PULL:
+                    await self._push_current([websocket])
+                else:
+                    await self._send_error(websocket, None, f"Unknown clipboard message: {msg_type!r}")
+        finally:
+            self._clients.discard(websocket)
+
+    async def _apply(self, websocket: "WebSocket", transfer: ClipboardTransfer) -> None:
+        """Decode a completed transfer and write it to the host clipboard."""
+        loop = asyncio.get_running_loop()
+        try:
+            payload = await loop.run_in_executor(None, transfer.finish)
+            async with self._change_lock:
+                # Don't echo our own write back to the clients
+                self._last_change = await loop.run_in_executor(None, self._write, transfer.mime, payload)
+        except ClipboardError as e:
+            await self._send_error(websocket, transfer.id, str(e))
+            return
+        except Exception as e:
+            logger.error(f"Clipboard write failed: {e}", exc_info=True)
+            await self._send_error(websocket, transfer.id, "Clipboard write failed")
+            return
+
+        logger.info(f"Clipboard set from browser: {transfer.mime}, {transfer.size} bytes ({transfer.encoding})")
+        await websocket.send_json(create_message(MessageType.CLIPBOARD_ACK, {"id": transfer.id, "ok": True}))
+
+    def _write(self, mime: str, data: bytes) -> int:
+        """Write the host clipboard and return its new change count (runs in executor)."""
+        self._backend.write(mime, data)
+        return self._backend.change_count()
+
+    async def _push_current(self, clients: list["WebSocket"]) -> None:
+        """Send the current host clipboard to the given clients."""
+        loop = asyncio.get_running_loop()
+        contents = await loop.run_in_executor(None, self._backend.read)
+        if contents is None:
+            return
+        mime, data = contents
+        if len(data) > self._max_bytes:
+            logger.warning(f"Host clipboard too large to sync ({len(data)} bytes)")
+            return
+
+        encoding, encoded = await loop.run_in_executor(None, encode_payload, data)
+        transfer_id = secrets.token_hex(8)
+        begin = create_message(MessageType.CLIPBOARD_BEGIN, {
+            "id": transfer_id, "mime": mime, "size": len(data), "encoding": encoding,
+        })
+        for websocket in clients:
+            try:
+                await websocket.send_json(begin)
+                for offset in range(0, len(encoded), self._chunk_size):
+                    await websocket.send_bytes(encoded[offset:offset + self._chunk_size])
+                await websocket.send_json(create_message(MessageType.CLIPBOARD_END, {"id": transfer_id}))
+            except Exception as e:
+                logger.debug(f"Clipboard push failed: {e}")
+
+    async def _send_error(self, websocket: "WebSocket", transfer_id: Any, message: str) -> None:
+        """Report a rejected transfer to the client."""
+        logger.warning(f"Clipboard transfer rejected: {message}")
+        await websocket.send_json(create_message(
+            MessageType.CLIPBOARD_ACK, {"id": transfer_id, "ok": False, "error": message}
+        ))
+
+    async def run(self) -> None:
+        """Push host clipboard changes to connected clients until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                async with self._change_lock:
+                    change = await loop.run_in_executor(None, self._backend.change_count)
+                    changed = self._last_change is not None and change != self._last_change
+                    self._last_change = change
+                if changed and self._clients:
+                    await self._push_current(list(self._clients))
+            except Exception as e:
+                logger.error(f"Clipboard watch failed: {e}", exc_info=True)
+            await asyncio.sleep(self._poll_interval)
@@ -0,0 +1,138 @@
+"""Clock synchronization and one-way latency estimation.
+
+This module provides the ClockSync class, which runs NTP-style timestamped
+ping exchanges with the client to estimate the offset between the client and
+server clocks. With a filtered offset estimate, client-side event timestamps
+can be mapped onto the server clock to compute each event's network delay and
+staleness on arrival.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from whip.protocol import MessageType, create_message
+
+logger = logging.getLogger(__name__)
+
+
+def now_ms() -> float:
+    """Return the current server time in milliseconds since epoch."""
+    return time.time() * 1000
+
+
+class ClockSample(NamedTuple):
+    """A single ping exchange measurement."""
+
+    offset: float  # Estimated client clock minus server clock (milliseconds)
+    rtt: float  # Round-trip time excluding client processing (milliseconds)
+
+
+class ClockSync:
+    """Estimates client clock offset and RTT from timestamped pings.
+
+    The server sends ping with t0 (server send time). The client replies with
+    pong carrying t0, t1 (client receive time) and t2 (client send time), and
+    the server records t3 on arrival. Following NTP:
+
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        rtt    = (t3 - t0) - (t2 - t1)
+
+    Only the most recent samples are kept, and the sample with the lowest RTT
+    is used as the estimate since it suffers the least queuing asymmetry.
+    """
+
+    def __init__(self, window: int = 8, interval: float = 5.0, warmup_interval: float = 0.25) -> None:
+        """Initialize clock synchronization.
+
+        Args:
+            window: Number of recent samples kept for filtering
+            interval: Time between pings once warmed up, in seconds
+            warmup_interval: Time between pings until the window is full, in seconds
+        """
+        self._samples: deque[ClockSample] = deque(maxlen=window)
+        self._interval = interval
+        self._warmup_interval = warmup_interval
+        self._best: ClockSample | None = None
+        self._pings_sent = 0
+
+    def make_ping(self) -> dict[str, Any]:
+        """Create a timestamped ping message to send to the client."""
+        self._pings_sent += 1
+        return create_message(MessageType.PING, {"t0": now_ms()})
+
+    def add_sample(self, t0: float, t1: float, t2: float, t3: float | None = None) -> ClockSample | None:
+        """Record a completed ping exchange.
+
+        Args:
+            t0: Server time the ping was sent (milliseconds)
+            t1: Client time the ping was received (milliseconds)
+            t2: Client time the pong was sent (milliseconds)
+            t3: Server time the pong was received (defaults to now)
+
+        Returns:
+            The recorded sample, or None if the exchange was invalid
+        """
+        if t3 is None:
+            t3 = now_ms()
+
+        rtt = (t3 - t0) - (t2 - t1)
+        if rtt < 0:
+            logger.debug(f"Discarding clock sample with negative RTT: {rtt:.1f}ms")
+            return None
+
+        sample = ClockSample(offset=((t1 - t0) + (t2 - t3)) / 2, rtt=rtt)
+        self._samples.append(sample)
+        self._best = min(self._samples, key=lambda s: s.rtt)
+        return sample
+
+    @property
+    def synced(self) -> bool:
+        """Check whether an offset estimate is available."""
+        return self._best is not None
+
+    @property
+    def offset(self) -> float:
+        """Filtered client-minus-server clock offset in milliseconds."""
+        return self._best.offset if self._best is not None else 0.0
+
+    @property
+    def rtt(self) -> float | None:
+        """Filtered round-trip time in milliseconds, if synced."""
+        return self._best.rtt if self._best is not None else None
+
+    def to_server_time(self, client_timestamp: float) -> float:
+        """Map a client timestamp onto the server clock."""
+        return client_timestamp - self.offset
+
+    def network_delay(self, client_timestamp: float, received_at: float | None = None) -> float | None:
+        """Compute the one-way delay of an event sent at client_timestamp.
+
+        Args:
+            client_timestamp: Client-side send time (milliseconds since epoch)
+            received_at: Server receive time (defaults to now)
+
+        Returns:
+            Delay in milliseconds, or None if the clock is not yet synced
+        """
+        if not self.synced:
+            return None
+        if received_at is None:
+            received_at = now_ms()
+        return received_at - self.to_server_time(client_timestamp)
+
+    async def run(self, send: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+        """Send pings periodically until cancelled.
+
+        Args:
+            send: Async callable that delivers a message to the client
+        """
+        while True:
+            try:
+                await send(self.make_ping())
+            except Exception as e:
+                logger.debug(f"Clock sync ping failed: {e}")
+            warming_up = self._pings_sent < (self._samples.maxlen or 0)
+            await asyncio.sleep(self._warmup_interval if warming_up else self._interval)
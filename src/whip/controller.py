@@ -49,6 +49,15 @@ class InputController:
         # Set mouse position
         self._mouse.position = (x, y)
 
+    def get_position(self) -> tuple[float, float]:
+        """Get the actual mouse position as normalized coordinates.
+
+        Returns:
+            Tuple of normalized (x, y) coordinates (0.0-1.0 range)
+        """
+        x, y = self._mouse.position
+        return x / self._screen_width, y / self._screen_height
+
     def click(self, button: str, x: float, y: float) -> None:
         """Perform a single click at the specified normalized coordinates.
 
@@ -72,16 +81,17 @@ class InputController:
         # Perform single click
         self._mouse.click(pynput_button, 1)
 
-    def mouse_down(self, button: str, x: float, y: float) -> None:
+    def mouse_down(self, button: str, x: float | None, y: float | None) -> None:
         """Press mouse button down at the specified normalized coordinates.
 
         Args:
             button: Button to press ("left", "right", or "middle")
-            x: Normalized X coordinate (0.0-1.0)
-            y: Normalized Y coordinate (0.0-1.0)
+            x: Normalized X coordinate (0.0-1.0), None to press in place
+            y: Normalized Y coordinate (0.0-1.0), None to press in place
         """
         # Move to position first
-        self.move_mouse(x, y)
+        if x is not None and y is not None:
+            self.move_mouse(x, y)
 
         # Map button string to pynput Button
         button_map = {
@@ -95,16 +105,17 @@ class InputController:
         # Press button
         self._mouse.press(pynput_button)
 
-    def mouse_up(self, button: str, x: float, y: float) -> None:
+    def mouse_up(self, button: str, x: float | None, y: float | None) -> None:
         """Release mouse button at the specified normalized coordinates.
 
         Args:
             button: Button to release ("left", "right", or "middle")
-            x: Normalized X coordinate (0.0-1.0)
-            y: Normalized Y coordinate (0.0-1.0)
+            x: Normalized X coordinate (0.0-1.0), None to release in place
+            y: Normalized Y coordinate (0.0-1.0), None to release in place
         """
-        # Move to position first
-        self.move_mouse(x, y)
+        # Move to position first (unless released outside the canvas)
+        if x is not None and y is not None:
+            self.move_mouse(x, y)
 
         # Map button string to pynput Button
         button_map = {
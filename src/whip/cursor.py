@@ -0,0 +1,118 @@
+"""Server-pushed cursor position feedback.
+
+This module provides the CursorFeedback class, which periodically samples the
+real host cursor position and pushes it to the client. The client renders a
+locally predicted cursor immediately and reconciles it against this feedback,
+which reflects clamping, deduplication and any local movement on the host.
+"""
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from whip.clock import now_ms
+from whip.protocol import MessageType, create_message
+
+if TYPE_CHECKING:
+    from whip.backend import InputBackend
+
+logger = logging.getLogger(__name__)
+
+
+class CursorFeedback:
+    """Rate-limited, change-only cursor position feedback.
+
+    Samples the controller position at a fixed low rate and sends a cursor
+    message only when the position differs from the last one sent. The
+    timestamp carried is the time of the most recent injection, or the sample
+    time if the cursor moved without any injection (local host movement).
+    """
+
+    def __init__(
+        self,
+        controller: "InputBackend",
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        interval: float = 0.05,
+        has_clients: Callable[[], bool] | None = None,
+    ) -> None:
+        """Initialize cursor feedback.
+
+        Args:
+            controller: Input backend to read the cursor position from
+            send: Async callable that delivers a message to the client
+            interval: Minimum time between feedback messages in seconds (~20Hz)
+            has_clients: Optional callable; polling is skipped while it returns False
+        """
+        self._controller = controller
+        self._send = send
+        self._interval = interval
+        self._has_clients = has_clients
+        self._last_sent: tuple[float, float] | None = None
+        self._injected_at: float | None = None
+
+    def record_injection(self) -> None:
+        """Record that a mouse event was just injected on the host."""
+        self._injected_at = now_ms()
+
+    async def _sample(self) -> tuple[float, float]:
+        """Read the host cursor position, rounded to the precision sent."""
+        loop = asyncio.get_running_loop()
+        x, y = await loop.run_in_executor(None, self._controller.get_position)
+        return round(x, 5), round(y, 5)
+
+    async def poll(self) -> bool:
+        """Sample the cursor once and send feedback if it changed.
+
+        Returns:
+            True if a feedback message was sent, False otherwise
+        """
+        position = await self._sample()
+        if position == self._last_sent:
+            # An injection that didn't move the cursor must not mark the next
+            # (local) host move as injected
+            self._injected_at = None
+            return False
+
+        injected = self._injected_at is not None
+        timestamp = self._injected_at if self._injected_at is not None else now_ms()
+        self._injected_at = None
+        self._last_sent = position
+
+        await self._send(create_message(MessageType.CURSOR, {
+            "x": position[0],
+            "y": position[1],
+            "timestamp": timestamp,
+            "injected": injected,
+        }))
+        return True
+
+    async def send_current(self, send: Callable[[dict[str, Any]], Awaitable[None]]) -> None:
+        """Send the current cursor position to one newly connected client.
+
+        Change-only polling would otherwise leave the client with nothing to
+        reconcile against until the host cursor next moves.
+
+        Args:
+            send: Async callable that delivers a message to that client
+        """
+        position = await self._sample()
+        await send(create_message(MessageType.CURSOR, {
+            "x": position[0],
+            "y": position[1],
+            "timestamp": now_ms(),
+            "injected": False,
+        }))
+
+    async def run(self) -> None:
+        """Sample and send cursor feedback until cancelled."""
+        while True:
+            try:
+                if self._has_clients is None or self._has_clients():
+                    await self.poll()
+                else:
+                    # Nobody to tell: new clients get send_current() on connect
+                    self._last_sent = None
+                    self._injected_at = None
+            except Exception as e:
+                logger.error(f"Cursor feedback failed: {e}", exc_info=True)
+            await asyncio.sleep(self._interval)
@@ -0,0 +1,183 @@
+"""Fast-path decoder for incoming WebSocket frames.
+
+This module turns raw JSON frames into the slotted event objects defined in
+whip.protocol. Message types are dispatched through a dict built once at
+import time, and every field is type- and range-checked so malformed input is
+rejected before it reaches the event queue.
+"""
+
+import json
+import math
+from typing import Any, Callable
+
+from whip.protocol import (
+    Echo,
+    Event,
+    KeyDown,
+    KeyUp,
+    MessageType,
+    MouseDown,
+    MouseMove,
+    MouseUp,
+    Ping,
+    Pong,
+)
+
+INPUT_EVENT_TYPES = (MouseMove, MouseDown, MouseUp, KeyDown, KeyUp)
+VALID_BUTTONS = frozenset({"left", "right", "middle"})
+MAX_KEY_LENGTH = 32  # Longest browser key/code names are ~20 characters
+
+
+class DecodeError(ValueError):
+    """Raised when a frame is not a valid WHIP message."""
+
+
+def _number(data: dict[str, Any], name: str) -> float:
+    """Read a required finite number field."""
+    value = data.get(name)
+    # bool is a subclass of int but never a valid coordinate or timestamp
+    if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+        raise DecodeError(f"Field {name!r} must be a finite number, got {value!r}")
+    return float(value)
+
+
+def _optional_number(data: dict[str, Any], name: str) -> float | None:
+    """Read an optional finite number field."""
+    if data.get(name) is None:
+        return None
+    return _number(data, name)
+
+
+def _coord(data: dict[str, Any], name: str) -> float:
+    """Read a required normalized coordinate (0.0-1.0)."""
+    value = _number(data, name)
+    if not 0.0 <= value <= 1.0:
+        raise DecodeError(f"Coordinate {name!r} out of range: {value}")
+    return value
+
+
+def _button(data: dict[str, Any]) -> str:
+    """Read a mouse button name."""
+    button = data.get("button", "left")
+    if button not in VALID_BUTTONS:
+        raise DecodeError(f"Invalid mouse button: {button!r}")
+    return button
+
+
+def _key_field(data: dict[str, Any], name: str, required: bool) -> str:
+    """Read a bounded key/code string."""
+    value = data.get(name, "")
+    if not isinstance(value, str) or len(value) > MAX_KEY_LENGTH or (required and not value):
+        raise DecodeError(f"Invalid {name!r}: {value!r}")
+    return value
+
+
+def _decode_mouse_move(data: dict[str, Any]) -> MouseMove:
+    return MouseMove(_coord(data, "x"), _coord(data, "y"), _optional_number(data, "timestamp"))
+
+
+def _decode_mouse_down(data: dict[str, Any]) -> MouseDown:
+    return MouseDown(_button(data), _coord(data, "x"), _coord(data, "y"), _optional_number(data, "timestamp"))
+
+
+def _decode_mouse_up(data: dict[str, Any]) -> MouseUp:
+    # Releases outside the canvas are sent as (-1, -1): release in place
+    if data.get("x") == -1 and data.get("y") == -1:
+        return MouseUp(_button(data), None, None, _optional_number(data, "timestamp"))
+    return MouseUp(_button(data), _coord(data, "x"), _coord(data, "y"), _optional_number(data, "timestamp"))
+
+
+def _decode_key_down(data: dict[str, Any]) -> KeyDown:
+    return KeyDown(
+        _key_field(data, "key", required=True),
+        _key_field(data, "code", required=False),
+        _optional_number(data, "timestamp"),
+    )
+
+
+def _decode_key_up(data: dict[str, Any]) -> KeyUp:
+    return KeyUp(
+        _key_field(data, "key", required=True),
+        _key_field(data, "code", required=False),
+        _optional_number(data, "timestamp"),
+    )
+
+
+def _decode_ping(data: dict[str, Any]) -> Ping:
+    return Ping(_optional_number(data, "t0"))
+
+
+def _decode_pong(data: dict[str, Any]) -> Pong:
+    return Pong(_number(data, "t0"), _number(data, "t1"), _number(data, "t2"))
+
+
+def _decode_echo(data: dict[str, Any]) -> Echo:
+    return Echo(data)
+
+
+# O(1) dispatch table (StrEnum members hash like their string values)
+_DECODERS: dict[str, Callable[[dict[str, Any]], Event]] = {
+    MessageType.MOUSE_MOVE: _decode_mouse_move,
+    MessageType.MOUSE_DOWN: _decode_mouse_down,
+    MessageType.MOUSE_UP: _decode_mouse_up,
+    MessageType.KEY_DOWN: _decode_key_down,
+    MessageType.KEY_UP: _decode_key_up,
+    MessageType.PING: _decode_ping,
+    MessageType.PONG: _decode_pong,
+    MessageType.ECHO: _decode_echo,
+}
+
+
+def decode_message(raw: Any) -> Event:
+    """Decode an already-parsed JSON message into a typed event.
+
+    Args:
+        raw: Parsed JSON value received from WebSocket
+
+    Returns:
+        Typed event object
+
+    Raises:
+        DecodeError: If the message type is unknown or a field is invalid
+    """
+    if not isinstance(raw, dict):
+        raise DecodeError("Message must be a JSON object")
+
+    msg_type = raw.get("type")
+    decoder = _DECODERS.get(msg_type) if isinstance(msg_type, str) else None
+    if decoder is None:
+        raise DecodeError(f"Invalid message type: {msg_type!r}")
+
+    data = raw.get("data", {})
+    if not isinstance(data, dict):
+        raise DecodeError("Message data must be a JSON object")
+
+    event = decoder(data)
+
+    seq = raw.get("seq")
+    if seq is not None:
+        if type(seq) is not int or seq < 0:
+            raise DecodeError(f"Invalid sequence number: {seq!r}")
+        if isinstance(event, INPUT_EVENT_TYPES):
+            event.seq = seq
+
+    return event
+
+
+def decode(frame: str | bytes) -> Event:
+    """Decode a raw WebSocket text frame into a typed event.
+
+    Args:
+        frame: Raw JSON frame
+
+    Returns:
+        Typed event object
+
+    Raises:
+        DecodeError: If the frame is not valid JSON or not a valid message
+    """
+    try:
+        raw = json.loads(frame)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise DecodeError(f"Invalid JSON: {e}") from e
+    return decode_message(raw)
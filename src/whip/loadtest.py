@@ -0,0 +1,451 @@
+"""Multi-client soak and load-test harness.
+
+This module opens many WebSocket clients against the WHIP app and drives them
+with mouse, keyboard or mixed input profiles for a fixed duration. By default
+the server runs in-process on the null backend (WHIP_BACKEND=null), so events
+are processed end to end without touching the host's mouse or keyboard.
+
+It reports throughput, ack latency percentiles, event-loop lag and
+tracemalloc/RSS growth over time, so leaks and latency cliffs show up before
+they reach production.
+
+Usage:
+    uv run python -m whip.loadtest --clients 4 --rate 240 --duration 3600 --profile mixed
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator
+
+from websockets.asyncio.client import connect
+
+PROFILES = ("mouse", "keyboard", "mixed")
+
+
+class Histogram:
+    """Fixed-memory latency histogram with linear buckets.
+
+    Soak runs produce millions of samples, so values are bucketed instead of
+    stored; the harness's own memory use stays flat and does not pollute the
+    tracemalloc measurements.
+    """
+
+    def __init__(self, resolution_ms: float = 0.05, max_ms: float = 2000.0) -> None:
+        """Initialize histogram.
+
+        Args:
+            resolution_ms: Bucket width in milliseconds
+            max_ms: Largest tracked value; larger values land in the last bucket
+        """
+        self._resolution = resolution_ms
+        self._counts = [0] * (int(max_ms / resolution_ms) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def record(self, value_ms: float) -> None:
+        """Record one sample in milliseconds."""
+        index = min(int(max(value_ms, 0.0) / self._resolution), len(self._counts) - 1)
+        self._counts[index] += 1
+        self.count += 1
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def percentile(self, p: float) -> float:
+        """Return the approximate p-th percentile (0-100) in milliseconds."""
+        if self.count == 0:
+            return 0.0
+        target = math.ceil(self.count * p / 100)
+        seen = 0
+        for index, bucket in enumerate(self._counts):
+            seen += bucket
+            if seen >= target:
+                return min((index + 1) * self._resolution, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        """Return count, p50/p95/p99 and max."""
+        return {
+            "count": self.count,
+            "p50": round(self.percentile(50), 2),
+            "p95": round(self.percentile(95), 2),
+            "p99": round(self.percentile(99), 2),
+            "max": round(self.max, 2),
+        }
+
+
+@dataclass(slots=True)
+class MemorySample:
+    """Process memory at one point in the run."""
+
+    elapsed: float  # Seconds since the load started
+    traced_bytes: int  # Current tracemalloc usage
+    rss_bytes: int  # Resident set size (peak RSS where current is unavailable)
+    events_sent: int  # Events sent by all clients so far
+
+
+@dataclass
+class ClientStats:
+    """Counters aggregated across all clients."""
+
+    sent: int = 0
+    acked: int = 0
+    stale: int = 0
+    errors: int = 0
+    disconnects: int = 0
+    ack_latency: Histogram = field(default_factory=Histogram)
+
+
+def rss_bytes() -> int:
+    """Return the current RSS, or the peak RSS where /proc is unavailable (macOS)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def mouse_profile(rng: random.Random) -> Iterator[dict[str, Any]]:
+    """Random-walk hover motion with an occasional drag."""
+    x, y = rng.random(), rng.random()
+    while True:
+        drag = rng.random() < 0.02
+        if drag:
+            yield {"type": "mouse_down", "data": {"button": "left", "x": x, "y": y}}
+        for _ in range(rng.randint(20, 120) if drag else 1):
+            x = min(1.0, max(0.0, x + rng.uniform(-0.01, 0.01)))
+            y = min(1.0, max(0.0, y + rng.uniform(-0.01, 0.01)))
+            yield {"type": "mouse_move", "data": {"x": round(x, 5), "y": round(y, 5)}}
+        if drag:
+            yield {"type": "mouse_up", "data": {"button": "left", "x": x, "y": y}}
+
+
+def keyboard_profile(rng: random.Random) -> Iterator[dict[str, Any]]:
+    """Typing: key_down/key_up pairs, occasionally with browser auto-repeat."""
+    while True:
+        letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        code = f"Key{letter.upper()}"
+        for _ in range(rng.randint(2, 8) if rng.random() < 0.05 else 1):
+            yield {"type": "key_down", "data": {"key": letter, "code": code}}
+        yield {"type": "key_up", "data": {"key": letter, "code": code}}
+
+
+def mixed_profile(rng: random.Random) -> Iterator[dict[str, Any]]:
+    """Mostly mouse motion interleaved with typing bursts."""
+    mouse = mouse_profile(rng)
+    keyboard = keyboard_profile(rng)
+    while True:
+        if rng.random() < 0.8:
+            yield next(mouse)
+        else:
+            # Finish the key press so keys are never left held
+            while (message := next(keyboard))["type"] != "key_up":
+                yield message
+            yield message
+
+
+def make_profile(name: str, seed: int) -> Iterator[dict[str, Any]]:
+    """Create an input profile generator by name."""
+    rng = random.Random(seed)
+    return {"mouse": mouse_profile, "keyboard": keyboard_profile, "mixed": mixed_profile}[name](rng)
+
+
+async def run_client(url: str, profile: Iterator[dict[str, Any]], rate: float, deadline: float,
+                     stats: ClientStats) -> None:
+    """Drive one WebSocket client at a fixed event rate until the deadline.
+
+    Acks arrive in send order, so each ack is matched to the oldest unacked
+    send time. Server clock sync pings are answered like the browser does.
+    """
+    sent_at: deque[float] = deque()
+
+    async with connect(url, max_queue=None) as ws:
+        async def receive() -> None:
+            async for raw in ws:
+                message = json.loads(raw)
+                msg_type = message.get("type")
+                if msg_type == "ack":
+                    if sent_at:
+                        stats.ack_latency.record((time.perf_counter() - sent_at.popleft()) * 1000)
+                    stats.acked += 1
+                    if message.get("stale"):
+                        stats.stale += 1
+                elif msg_type == "ping":
+                    t1 = time.time() * 1000
+                    await ws.send(json.dumps({
+                        "type": "pong",
+                        "data": {"t0": message["data"]["t0"], "t1": t1, "t2": time.time() * 1000},
+                    }))
+                elif msg_type == "error":
+                    stats.errors += 1
+
+        receiver = asyncio.create_task(receive())
+        interval = 1.0 / rate
+        next_send = time.perf_counter()
+
+        try:
+            while time.perf_counter() < deadline:
+                message = next(profile)
+                message["data"]["timestamp"] = time.time() * 1000
+                sent_at.append(time.perf_counter())
+                await ws.send(json.dumps(message))
+                stats.sent += 1
+
+                next_send += interval
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -1.0:
+                    # Fell far behind: don't burst to catch up
+                    next_send = time.perf_counter()
+
+            # Give outstanding acks a moment to arrive
+            drain_deadline = time.perf_counter() + 2.0
+            while sent_at and time.perf_counter() < drain_deadline:
+                await asyncio.sleep(0.01)
+        finally:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+
+
+async def monitor_loop_lag(histogram: Histogram, stop: asyncio.Event, interval: float = 0.05) -> None:
+    """Record how late the event loop wakes a sleeping task."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        histogram.record(max(0.0, (time.perf_counter() - start - interval) * 1000))
+
+
+async def sample_memory(samples: list[MemorySample], stats: ClientStats, start: float,
+                        stop: asyncio.Event, interval: float) -> None:
+    """Record tracemalloc and RSS usage periodically."""
+    while True:
+        current, _ = tracemalloc.get_traced_memory()
+        samples.append(MemorySample(round(time.perf_counter() - start, 1), current, rss_bytes(), stats.sent))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+
+def growth_per_minute(samples: list[MemorySample], attr: str) -> float:
+    """Least-squares slope of a memory series in bytes per minute."""
+    if len(samples) < 2:
+        return 0.0
+    xs = [s.elapsed for s in samples]
+    ys = [getattr(s, attr) for s in samples]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if var == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var * 60
+
+
+async def start_server(host: str = "127.0.0.1") -> tuple[Any, asyncio.Task, int]:
+    """Start the WHIP app in-process on the null backend and an ephemeral port.
+
+    WHIP_BACKEND is only overridden until the app's startup has chosen its
+    backend, then restored so the caller's environment is left untouched.
+    """
+    import uvicorn
+
+    from whip.main import app
+
+    previous = os.environ.get("WHIP_BACKEND")
+    os.environ["WHIP_BACKEND"] = "null"
+    try:
+        server = uvicorn.Server(uvicorn.Config(app, host=host, port=0, log_level="warning"))
+        task = asyncio.create_task(server.serve())
+        while not server.started:
+            if task.done():
+                task.result()
+            await asyncio.sleep(0.01)
+    finally:
+        if previous is None:
+            del os.environ["WHIP_BACKEND"]
+        else:
+            os.environ["WHIP_BACKEND"] = previous
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return server, task, port
+
+
+async def run_load_test(clients: int = 4, rate: float = 240.0, duration: float = 60.0,
+                        profile: str = "mixed", sample_interval: float = 10.0,
+                        url: str | None = None, seed: int = 0) -> dict[str, Any]:
+    """Run the load test and return a report.
+
+    Args:
+        clients: Number of concurrent WebSocket clients
+        rate: Events per second sent by each client
+        duration: Load duration in seconds
+        profile: Input profile ("mouse", "keyboard" or "mixed")
+        sample_interval: Seconds between memory samples
+        url: External server WebSocket URL; starts an in-process server if None
+        seed: Random seed for reproducible input streams
+
+    Returns:
+        JSON-serializable report dict
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile: {profile}")
+
+    # Loop lag and memory are sampled in this process: they describe the
+    # server only when it runs in-process, otherwise just the harness
+    metrics_scope = "server" if url is None else "client"
+    if url is None:
+        # whip.main configures logging on import, so import it before quieting
+        import whip.main  # noqa: F401
+
+    # Per-event debug logging would dominate the measurements
+    root_logger = logging.getLogger()
+    previous_level = root_logger.level
+    root_logger.setLevel(logging.WARNING)
+    try:
+        return await _run_load_test(clients, rate, duration, profile, sample_interval, url, seed, metrics_scope)
+    finally:
+        root_logger.setLevel(previous_level)
+
+
+async def _run_load_test(clients: int, rate: float, duration: float, profile: str, sample_interval: float,
+                         url: str | None, seed: int, metrics_scope: str) -> dict[str, Any]:
+    """Run the load test with logging already quieted (see run_load_test)."""
+    tracemalloc.start()
+    server = server_task = None
+    if url is None:
+        server, server_task, port = await start_server()
+        url = f"ws://127.0.0.1:{port}/ws"
+
+    stats = ClientStats()
+    loop_lag = Histogram(resolution_ms=0.1)
+    samples: list[MemorySample] = []
+    stop = asyncio.Event()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    monitors = [
+        asyncio.create_task(monitor_loop_lag(loop_lag, stop)),
+        asyncio.create_task(sample_memory(samples, stats, start, stop, sample_interval)),
+    ]
+    results = await asyncio.gather(
+        *(run_client(url, make_profile(profile, seed + i), rate, deadline, stats) for i in range(clients)),
+        return_exceptions=True,
+    )
+    stats.disconnects = sum(1 for r in results if isinstance(r, BaseException))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await asyncio.gather(*monitors)
+
+    # Growth is measured after warm-up (connections, sessions, first allocations)
+    warmup = max(sample_interval, duration * 0.1)
+    steady = [s for s in samples if s.elapsed >= warmup]
+
+    injected: dict[str, int] = {}
+    if server is not None and server_task is not None:
+        import whip.main
+
+        if whip.main.input_controller is not None:
+            injected = dict(getattr(whip.main.input_controller, "counts", {}))
+        server.should_exit = True
+        await server_task
+    tracemalloc.stop()
+
+    return {
+        "config": {"clients": clients, "rate": rate, "duration": duration, "profile": profile, "url": url},
+        "metrics_scope": metrics_scope,
+        "elapsed_s": round(elapsed, 1),
+        "sent": stats.sent,
+        "acked": stats.acked,
+        "stale": stats.stale,
+        "errors": stats.errors,
+        "disconnects": stats.disconnects,
+        "throughput_per_s": round(stats.acked / elapsed, 1) if elapsed else 0.0,
+        "ack_latency_ms": stats.ack_latency.summary(),
+        "loop_lag_ms": loop_lag.summary(),
+        "injected": injected,
+        "memory": {
+            "warmup_s": round(warmup, 1),
+            "traced_growth_bytes_per_min": round(growth_per_minute(steady, "traced_bytes")),
+            "rss_growth_bytes_per_min": round(growth_per_minute(steady, "rss_bytes")),
+            "samples": [asdict(s) for s in samples],
+        },
+    }
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Format a load test report for the terminal."""
+    config = report["config"]
+    ack = report["ack_latency_ms"]
+    lag = report["loop_lag_ms"]
+    memory = report["memory"]
+    lines = [
+        "=" * 70,
+        f"WHIP load test: {config['clients']} clients x {config['rate']:g} Hz, "
+        f"profile={config['profile']}, {report['elapsed_s']}s",
+        "=" * 70,
+        f"Events:     sent={report['sent']} acked={report['acked']} stale={report['stale']} "
+        f"errors={report['errors']} disconnects={report['disconnects']}",
+        f"Throughput: {report['throughput_per_s']} acks/s",
+        f"Ack latency (ms):    p50={ack['p50']} p95={ack['p95']} p99={ack['p99']} max={ack['max']}",
+    ]
+    # With an external server the process-level figures only describe the harness
+    scope = "Server" if report["metrics_scope"] == "server" else "Client-side (harness only, server not measured)"
+    lines.append(f"{scope} event-loop lag (ms): p50={lag['p50']} p95={lag['p95']} p99={lag['p99']} max={lag['max']}")
+    if report["injected"]:
+        lines.append(f"Injected (null backend): {report['injected']}")
+    lines.append(
+        f"{scope} memory growth after {memory['warmup_s']}s warm-up: "
+        f"traced={memory['traced_growth_bytes_per_min'] / 1024:.1f} KiB/min "
+        f"rss={memory['rss_growth_bytes_per_min'] / 1024:.1f} KiB/min"
+    )
+    lines.append(f"{'elapsed(s)':>10} {'events':>10} {'traced(KiB)':>12} {'rss(MiB)':>10}")
+    for sample in memory["samples"]:
+        lines.append(
+            f"{sample['elapsed']:>10} {sample['events_sent']:>10} "
+            f"{sample['traced_bytes'] / 1024:>12.1f} {sample['rss_bytes'] / 1024 / 1024:>10.1f}"
+        )
+    lines.append("=" * 70)
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="WHIP multi-client soak and load test")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent WebSocket clients (default: 4)")
+    parser.add_argument("--rate", type=float, default=240.0, help="events per second per client (default: 240)")
+    parser.add_argument("--duration", type=float, default=60.0, help="load duration in seconds (default: 60)")
+    parser.add_argument("--profile", choices=PROFILES, default="mixed", help="input profile (default: mixed)")
+    parser.add_argument("--sample-interval", type=float, default=10.0,
+                        help="seconds between memory samples (default: 10)")
+    parser.add_argument("--url", help="target an external server instead of an in-process null backend")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load_test(
+        clients=args.clients,
+        rate=args.rate,
+        duration=args.duration,
+        profile=args.profile,
+        sample_interval=args.sample_interval,
+        url=args.url,
+        seed=args.seed,
+    ))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
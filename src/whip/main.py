@@ -1,15 +1,34 @@
+import asyncio
+import os
 import signal
 import sys
+import time
 import logging
 from pathlib import Path
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from typing import TYPE_CHECKING, Callable
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
-from whip.protocol import MessageType
-from whip.queue import EventQueue
-from whip.permissions import check_accessibility_permission, print_permission_instructions
-from whip.controller import InputController
-from whip.repeat import KeyRepeatManager
+from whip.protocol import (
+    Echo,
+    MessageType,
+    MouseDown,
+    MouseMove,
+    MouseUp,
+    Ping,
+    Pong,
+    create_message,
+)
+from whip.decoder import DecodeError, decode
+from whip.cursor import CursorFeedback
+from whip.clipboard import ClipboardSync, MemoryClipboard
+from whip.clock import now_ms
+from whip.null_controller import NullController
+from whip.pipeline import Pipeline
+from whip.session import ResumeState, Session
+
+if TYPE_CHECKING:
+    from whip.backend import InputBackend
 
 # Configure logging
 logging.basicConfig(
@@ -41,91 +60,113 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
 
 class ConnectionManager:
-    """Manages WebSocket connections (single connection for MVP)."""
+    """Manages WebSocket connections and their per-connection sessions.
+
+    When a session ends its token stays resumable for a grace period, so a
+    client reconnecting after a network drop continues its sequence numbers,
+    replayed events are not injected twice, and modifiers and mouse buttons
+    held at the drop are pressed again.
+    """
 
-    def __init__(self):
-        self.active_connection: WebSocket | None = None
+    def __init__(self, resume_grace: float = 120.0):
+        self.sessions: dict[str, Session] = {}
+        self._resume_grace = resume_grace
+        self._resumable: dict[str, tuple[ResumeState, float]] = {}  # token -> (state, expires_at)
+        self._closing: dict[str, asyncio.Future] = {}  # token -> close still in progress
 
-    async def connect(self, websocket: WebSocket):
-        """Accept and register a WebSocket connection."""
+    async def connect(self, websocket: WebSocket, token: str | None = None) -> Session:
+        """Accept a WebSocket connection and start (or resume) a session for it."""
         await websocket.accept()
-        self.active_connection = websocket
-        logger.info("Client connected")
 
-    def disconnect(self):
-        """Unregister the active connection."""
-        self.active_connection = None
-        logger.info("Client disconnected")
+        now = time.monotonic()
+        self._resumable = {t: r for t, r in self._resumable.items() if r[1] > now}
+
+        state: ResumeState | None = None
+        if token is not None:
+            previous = self.sessions.get(token)
+            if previous is not None:
+                # Reconnected before the old socket was noticed as dead: take
+                # over (disconnect makes the token resumable)
+                await self.disconnect(previous)
+                try:
+                    await previous.websocket.close(code=1000)
+                except Exception:
+                    pass
+            closing = self._closing.get(token)
+            if closing is not None:
+                # Reconnected while the old session is still closing
+                await asyncio.shield(closing)
+            if token in self._resumable:
+                state = self._resumable.pop(token)[0]
+
+        resumed = state is not None
+        session = Session(
+            websocket, input_controller, cursor_feedback,
+            session_id=token if resumed else None, last_seq=state.last_seq if state is not None else 0,
+            configure_pipeline=configure_pipeline,
+        )
+        self.sessions[session.id] = session
+        session.start()
+        if state is not None:
+            await session.restore_input(state)
+        await websocket.send_json(create_message(MessageType.SESSION, {
+            "token": session.id,
+            "last_seq": session.processed_seq,
+            "resumed": resumed,
+        }))
+        if cursor_feedback is not None:
+            await cursor_feedback.send_current(websocket.send_json)
+        logger.info(f"Client {'resumed' if resumed else 'connected'} (session {session.id[:8]}, seq {session.last_seq})")
+        return session
+
+    async def disconnect(self, session: Session):
+        """Unregister a session and reclaim everything it holds."""
+        if self.sessions.get(session.id) is session:
+            del self.sessions[session.id]
+            closing = asyncio.ensure_future(self._close_resumable(session))
+            self._closing[session.id] = closing
+        else:
+            closing = asyncio.ensure_future(session.close())
+        # Shielded so held keys are still released if the handler is cancelled
+        await asyncio.shield(closing)
+        logger.info(f"Client disconnected (session {session.id[:8]})")
+
+    async def _close_resumable(self, session: Session):
+        """Close a session, then make its token resumable."""
+        try:
+            await session.close()
+        finally:
+            # Resume after the last *processed* event: queued events discarded
+            # by close() are replayed by the client
+            self._resumable[session.id] = (ResumeState.from_session(session), time.monotonic() + self._resume_grace)
+            self._closing.pop(session.id, None)
+
+    async def send_json(self, message: dict):
+        """Send a message to every connected client."""
+        for session in list(self.sessions.values()):
+            try:
+                await session.websocket.send_json(message)
+            except Exception as e:
+                logger.debug(f"Send to client failed: {e}")
 
 
 manager = ConnectionManager()
-event_queue = EventQueue()
-input_controller: InputController | None = None
-repeat_manager: KeyRepeatManager | None = None
-_keys_pressed: set[str] = set()
-
+input_controller: "InputBackend | None" = None
+cursor_feedback: CursorFeedback | None = None
+clipboard_sync: ClipboardSync | None = None
 
-async def event_consumer():
-    """Background task that drains event queue and controls macOS input.
+# Extension point: set to a callable that adds site-specific stages to each
+# session's pipeline, e.g. pipeline.add_stage(stage, before="inject_key_down")
+configure_pipeline: Callable[[Pipeline], None] | None = None
 
-    Runs InputController operations in a thread executor to prevent blocking
-    the async event loop (pynput operations are synchronous).
-    """
-    import asyncio
-    global input_controller, repeat_manager, _keys_pressed
-    if input_controller is None:
-        return
+# Mouse moves older than this (one-way network delay) are stale: they are
+# dropped if a newer move arrives within STALE_HOLD_S, otherwise injected
+STALE_MOVE_MS = 250.0
+STALE_HOLD_S = 0.02
 
-    loop = asyncio.get_event_loop()
-
-    while True:
-        event = await event_queue.get_blocking(timeout=0.05)
-        if event is None:
-            continue
-
-        try:
-            msg_type = event.get("type")
-            data = event.get("data", {})
-
-            # Run InputController operations in thread executor to avoid blocking
-            if msg_type == MessageType.MOUSE_MOVE:
-                await loop.run_in_executor(
-                    None, input_controller.move_mouse, data.get("x", 0), data.get("y", 0)
-                )
-            elif msg_type == MessageType.MOUSE_DOWN:
-                await loop.run_in_executor(
-                    None, input_controller.mouse_down, data.get("button", "left"),
-                    data.get("x", 0), data.get("y", 0)
-                )
-            elif msg_type == MessageType.MOUSE_UP:
-                await loop.run_in_executor(
-                    None, input_controller.mouse_up, data.get("button", "left"),
-                    data.get("x", 0), data.get("y", 0)
-                )
-            elif msg_type == MessageType.KEY_DOWN:
-                key = data.get("key", "")
-                code = data.get("code", "")
-
-                # Only process if this is a new key press (not browser repeat)
-                if key not in _keys_pressed:
-                    _keys_pressed.add(key)
-                    await loop.run_in_executor(None, input_controller.key_down, key, code)
-                    # Start repeat timer for this key
-                    if repeat_manager is not None:
-                        repeat_manager.start_repeat(key, code)
-                # else: ignore browser repeat events
-
-            elif msg_type == MessageType.KEY_UP:
-                key = data.get("key", "")
-                code = data.get("code", "")
-                # Remove from pressed keys set
-                _keys_pressed.discard(key)
-                # Stop repeat timer before releasing key
-                if repeat_manager is not None:
-                    repeat_manager.stop_repeat(key)
-                await loop.run_in_executor(None, input_controller.key_up, key, code)
-        except Exception as e:
-            logger.error(f"Event processing failed: {e}", exc_info=True)
+# Sessions with no incoming frames for this long are closed (clients answer
+# clock sync pings every few seconds, so a live connection is never idle)
+SESSION_IDLE_TIMEOUT = 30.0
 
 
 @app.get("/")
@@ -134,76 +175,188 @@ async def root():
     return RedirectResponse(url="/static/index.html")
 
 
+@app.get("/stats")
+async def stats():
+    """Report per-session queue backlog, held input and pipeline timing."""
+    return {
+        "sessions": {session_id: session.stats() for session_id, session in manager.sessions.items()},
+    }
+
+
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for bidirectional communication with browser."""
-    await manager.connect(websocket)
+async def websocket_endpoint(websocket: WebSocket, session_token: str | None = Query(None, alias="session")):
+    """WebSocket endpoint for bidirectional communication with browser.
+
+    Clients pass ?session=<token> when reconnecting to resume their session.
+    """
+    session = await manager.connect(websocket, session_token)
     try:
         while True:
-            data = await websocket.receive_json()
+            # While a stale move is held, wait only briefly for a newer one
+            timeout = STALE_HOLD_S if session.has_held_move else SESSION_IDLE_TIMEOUT
+            try:
+                frame = await asyncio.wait_for(websocket.receive_text(), timeout=timeout)
+            except asyncio.TimeoutError:
+                if session.has_held_move:
+                    await session.flush_held_move()
+                    continue
+                logger.warning(f"Session {session.id[:8]} idle for {SESSION_IDLE_TIMEOUT}s, closing")
+                await websocket.close(code=1001)
+                break
+            received_at = now_ms()
+
+            # Decode and validate before anything is queued
+            try:
+                event = decode(frame)
+            except DecodeError as e:
+                logger.warning(f"Rejected message: {e}")
+                await websocket.send_json(create_message(MessageType.ERROR, {"message": str(e)}))
+                continue
 
             # Echo back messages based on type
-            msg_type = data.get("type")
-            if msg_type == MessageType.ECHO:
-                await websocket.send_json(data)
-            elif msg_type == MessageType.PING:
-                await websocket.send_json({"type": MessageType.PONG})
+            if isinstance(event, Echo):
+                await websocket.send_json(create_message(MessageType.ECHO, event.data))
+            elif isinstance(event, Ping):
+                # Client-initiated ping: reply NTP-style so the client can sync too
+                await websocket.send_json(create_message(
+                    MessageType.PONG, {"t0": event.t0, "t1": received_at, "t2": now_ms()}
+                ))
+            elif isinstance(event, Pong):
+                # Reply to our own clock sync ping
+                sample = session.clock.add_sample(event.t0, event.t1, event.t2, received_at)
+                if sample is not None:
+                    logger.debug(
+                        f"CLOCK offset={session.clock.offset:.1f}ms rtt={session.clock.rtt:.1f}ms "
+                        f"(sample offset={sample.offset:.1f}ms rtt={sample.rtt:.1f}ms)"
+                    )
             else:
                 # Log incoming event for debugging
-                event_data = data.get("data", {})
-                if msg_type == MessageType.MOUSE_MOVE:
-                    logger.debug(f"MOUSE move x={event_data.get('x', 0):.5f} y={event_data.get('y', 0):.5f}")
-                elif msg_type == MessageType.MOUSE_DOWN:
-                    logger.debug(f"MOUSE down button={event_data.get('button')} x={event_data.get('x', 0):.5f} y={event_data.get('y', 0):.5f}")
-                elif msg_type == MessageType.MOUSE_UP:
-                    logger.debug(f"MOUSE up button={event_data.get('button')} x={event_data.get('x', 0):.5f} y={event_data.get('y', 0):.5f}")
-                elif msg_type == MessageType.KEY_DOWN:
-                    logger.debug(f"KEY down key={event_data.get('key')} code={event_data.get('code')}")
-                elif msg_type == MessageType.KEY_UP:
-                    logger.debug(f"KEY up key={event_data.get('key')} code={event_data.get('code')}")
+                if isinstance(event, MouseMove):
+                    logger.debug(f"MOUSE move x={event.x:.5f} y={event.y:.5f}")
+                elif isinstance(event, (MouseDown, MouseUp)):
+                    logger.debug(f"MOUSE {event.type} button={event.button} x={event.x} y={event.y}")
                 else:
-                    logger.debug(f"EVENT {msg_type}: {event_data}")
-
-                # Queue for processing (Phase 3 will consume)
-                await event_queue.put(data)
+                    logger.debug(f"KEY {event.type} key={event.key} code={event.code}")
+
+                # Compute one-way network delay on the server clock
+                delay = session.clock.network_delay(event.timestamp, received_at) if event.timestamp else None
+                if delay is not None:
+                    session.latency.record(delay)
+                    logger.debug(f"LATENCY {event.type} delay={delay:.1f}ms")
+
+                # Events replayed after a reconnect that were already processed
+                if not session.accept_seq(event.seq):
+                    logger.debug(f"Ignoring duplicate {event.type} seq={event.seq}")
+                    await websocket.send_json({
+                        "type": "ack",
+                        "received": event.type,
+                        "seq": event.seq,
+                        "duplicate": True,
+                        "processed": session.processed_seq,
+                        "queue_size": session.queue.backlog_size
+                    })
+                    continue
+
+                # Queue for processing with server-side receive timestamp
+                event.received_at = received_at
+                stale = isinstance(event, MouseMove) and delay is not None and delay > STALE_MOVE_MS
+                await session.submit(event, stale)
                 await websocket.send_json({
                     "type": "ack",
-                    "received": msg_type,
-                    "queue_size": event_queue.backlog_size
+                    "received": event.type,
+                    "seq": event.seq,
+                    "stale": stale,
+                    "processed": session.processed_seq,
+                    "queue_size": session.queue.backlog_size
                 })
 
     except WebSocketDisconnect:
-        manager.disconnect()
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
-        manager.disconnect()
+    finally:
+        await manager.disconnect(session)
+
+
+@app.websocket("/ws/clipboard")
+async def clipboard_endpoint(websocket: WebSocket):
+    """Clipboard sync endpoint, kept off the input socket.
+
+    Clipboard payloads can be megabytes; a separate connection keeps them from
+    queueing behind (or in front of) input events on /ws.
+    """
+    await websocket.accept()
+    if clipboard_sync is None:
+        await websocket.close(code=1011, reason="Clipboard unavailable")
+        return
+    try:
+        await clipboard_sync.handle(websocket)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"Clipboard WebSocket error: {e}", exc_info=True)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close every session so no keys or buttons stay held on the host."""
+    for session in list(manager.sessions.values()):
+        await manager.disconnect(session)
 
 
 @app.on_event("startup")
 async def startup_event():
-    global input_controller, repeat_manager
+    global input_controller, cursor_feedback, clipboard_sync
 
     logger.info("WHIP server starting...")
-    logger.info("Checking Accessibility permissions...")
-
-    if not check_accessibility_permission():
-        print("\n" + "="*60)
-        print("ERROR: Accessibility permission NOT granted")
-        print("="*60)
-        print_permission_instructions()
-        print("="*60)
-        print("\nServer will start but macOS control will NOT work.")
-        print("Grant permission and restart the server.")
-        print("="*60 + "\n")
+
+    # WHIP_BACKEND=null counts events instead of injecting them (load tests)
+    if os.environ.get("WHIP_BACKEND", "pynput") == "null":
+        logger.warning("Using null input backend: events will NOT be injected")
+        input_controller = NullController()
     else:
-        logger.info("Accessibility permission: OK")
-        input_controller = InputController()
-        repeat_manager = KeyRepeatManager(input_controller)
+        # pynput/Quartz only work on macOS, so import them only when needed
+        from whip.permissions import check_accessibility_permission, print_permission_instructions
+
+        logger.info("Checking Accessibility permissions...")
+
+        if not check_accessibility_permission():
+            print("\n" + "="*60)
+            print("ERROR: Accessibility permission NOT granted")
+            print("="*60)
+            print_permission_instructions()
+            print("="*60)
+            print("\nServer will start but macOS control will NOT work.")
+            print("Grant permission and restart the server.")
+            print("="*60 + "\n")
+        else:
+            from whip.controller import InputController
+
+            logger.info("Accessibility permission: OK")
+            input_controller = InputController()
+
+    if input_controller is not None:
         logger.info(f"Screen size: {input_controller._screen_width}x{input_controller._screen_height}")
 
-        # Start background consumer task
-        import asyncio
-        asyncio.create_task(event_consumer())
-        logger.info("Event consumer started")
+        # Start cursor feedback task (server -> client actual position)
+        cursor_feedback = CursorFeedback(
+            input_controller, manager.send_json, has_clients=lambda: bool(manager.sessions)
+        )
+        asyncio.create_task(cursor_feedback.run())
+        logger.info("Cursor feedback started")
+
+    # Clipboard sync: the host pasteboard with a real backend, memory otherwise
+    if isinstance(input_controller, NullController):
+        clipboard_sync = ClipboardSync(MemoryClipboard())
+    else:
+        try:
+            from whip.clipboard import PasteboardClipboard
+
+            clipboard_sync = ClipboardSync(PasteboardClipboard())
+        except ImportError as e:
+            logger.warning(f"Clipboard sync disabled: {e}")
+    if clipboard_sync is not None:
+        asyncio.create_task(clipboard_sync.run())
+        logger.info("Clipboard sync started")
 
     logger.info(f"WHIP server running at http://0.0.0.0:9447")
@@ -0,0 +1,66 @@
+"""Non-injecting input backend for load testing and development.
+
+This module provides the NullController class, which implements the same
+interface as InputController (the InputBackend protocol) but only records
+what would have been injected. It needs no Accessibility permission and no
+macOS-only dependencies, so the server can run under load tests or on other
+platforms.
+"""
+
+from collections import Counter
+
+
+class NullController:
+    """Input controller that counts operations instead of performing them.
+
+    Tracks the cursor position it would have set so cursor feedback behaves
+    like it does with a real backend.
+    """
+
+    def __init__(self, screen_width: int = 1920, screen_height: int = 1080) -> None:
+        """Initialize controller with a virtual screen size.
+
+        Args:
+            screen_width: Virtual screen width in pixels
+            screen_height: Virtual screen height in pixels
+        """
+        self._screen_width = screen_width
+        self._screen_height = screen_height
+        self._position = (0, 0)
+        self.counts: Counter[str] = Counter()
+
+    def move_mouse(self, norm_x: float, norm_y: float) -> None:
+        """Record a mouse move to normalized coordinates (clamped like InputController)."""
+        x = max(0, min(int(norm_x * self._screen_width), self._screen_width - 1))
+        y = max(0, min(int(norm_y * self._screen_height), self._screen_height - 1))
+        self._position = (x, y)
+        self.counts["move_mouse"] += 1
+
+    def get_position(self) -> tuple[float, float]:
+        """Get the virtual mouse position as normalized coordinates."""
+        return self._position[0] / self._screen_width, self._position[1] / self._screen_height
+
+    def click(self, button: str, x: float, y: float) -> None:
+        """Record a click."""
+        self.move_mouse(x, y)
+        self.counts["click"] += 1
+
+    def mouse_down(self, button: str, x: float | None, y: float | None) -> None:
+        """Record a mouse button press."""
+        if x is not None and y is not None:
+            self.move_mouse(x, y)
+        self.counts["mouse_down"] += 1
+
+    def mouse_up(self, button: str, x: float | None, y: float | None) -> None:
+        """Record a mouse button release."""
+        if x is not None and y is not None:
+            self.move_mouse(x, y)
+        self.counts["mouse_up"] += 1
+
+    def key_down(self, key: str, code: str) -> None:
+        """Record a key press."""
+        self.counts["key_down"] += 1
+
+    def key_up(self, key: str, code: str) -> None:
+        """Record a key release."""
+        self.counts["key_up"] += 1
@@ -0,0 +1,370 @@
+"""Composable event-processing pipeline between the queue and the controller.
+
+This module provides the Pipeline class, an ordered list of stages per
+message type that every dequeued event flows through. Stages can filter,
+transform, rate-limit or inject events, and each one keeps timing counters so
+the cost of every step is visible. Site-specific processing is added by
+inserting stages rather than editing the consumer loop.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from whip.protocol import InputEvent, KeyDown, KeyUp, MessageType, MouseDown, MouseMove, MouseUp
+
+if TYPE_CHECKING:
+    from whip.backend import InputBackend
+    from whip.cursor import CursorFeedback
+    from whip.repeat import KeyRepeatManager
+
+INPUT_TYPES = (
+    MessageType.MOUSE_MOVE,
+    MessageType.MOUSE_DOWN,
+    MessageType.MOUSE_UP,
+    MessageType.KEY_DOWN,
+    MessageType.KEY_UP,
+)
+
+
+@dataclass(slots=True)
+class StageStats:
+    """Timing counters for a single pipeline stage."""
+
+    calls: int = 0
+    dropped: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+
+    @property
+    def mean_us(self) -> float:
+        """Mean time per call in microseconds."""
+        return self.total_ns / self.calls / 1000 if self.calls else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable snapshot."""
+        return {
+            "calls": self.calls,
+            "dropped": self.dropped,
+            "mean_us": round(self.mean_us, 1),
+            "max_us": round(self.max_ns / 1000, 1),
+        }
+
+
+class Stage:
+    """Base class for pipeline stages.
+
+    Subclasses override process() and return the (possibly replaced) event to
+    pass it on, or None to drop it.
+    """
+
+    def __init__(self, name: str) -> None:
+        """Initialize stage.
+
+        Args:
+            name: Unique stage name used for stats and insertion
+        """
+        self.name = name
+        self.stats = StageStats()
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        """Process an event. Return it to continue, or None to drop it."""
+        return event
+
+
+class FilterStage(Stage):
+    """Drops events for which the predicate returns False."""
+
+    def __init__(self, name: str, predicate: Callable[[InputEvent], bool]) -> None:
+        super().__init__(name)
+        self._predicate = predicate
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        return event if self._predicate(event) else None
+
+
+class TransformStage(Stage):
+    """Replaces events with the result of a function (None drops them)."""
+
+    def __init__(self, name: str, transform: Callable[[InputEvent], InputEvent | None]) -> None:
+        super().__init__(name)
+        self._transform = transform
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        return self._transform(event)
+
+
+class RateLimitStage(Stage):
+    """Drops events arriving faster than max_rate per message type."""
+
+    def __init__(self, name: str, max_rate: float) -> None:
+        """Initialize rate limiter.
+
+        Args:
+            name: Unique stage name
+            max_rate: Maximum events per second passed through, per message type
+        """
+        super().__init__(name)
+        self._min_interval = 1.0 / max_rate
+        self._last_passed: dict[MessageType, float] = {}
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        now = time.monotonic()
+        last = self._last_passed.get(event.type)
+        if last is not None and now - last < self._min_interval:
+            return None
+        self._last_passed[event.type] = now
+        return event
+
+
+class InjectStage(Stage):
+    """Runs a synchronous injection function in a thread executor.
+
+    pynput operations are synchronous, so they run off the event loop. The
+    event is passed on unchanged so later stages can observe it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        inject: Callable[[Any], None],
+        on_injected: Callable[[], None] | None = None,
+    ) -> None:
+        """Initialize injection stage.
+
+        Args:
+            name: Unique stage name
+            inject: Function performing the injection for one event
+            on_injected: Optional callback run on the event loop after injection
+        """
+        super().__init__(name)
+        self._inject = inject
+        self._on_injected = on_injected
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        await asyncio.get_running_loop().run_in_executor(None, self._inject, event)
+        if self._on_injected is not None:
+            self._on_injected()
+        return event
+
+
+class KeyRepeatFilter(Stage):
+    """Drops browser auto-repeat key_down events for keys already held.
+
+    Server-side repeat (KeyRepeatManager) replaces browser repeat, so only the
+    first key_down of a press passes. Only reads the held-key set; KeyTracker
+    updates it after injection.
+    """
+
+    def __init__(self, keys_pressed: set[str], name: str = "key_repeat_filter") -> None:
+        """Initialize filter.
+
+        Args:
+            keys_pressed: Set of currently held keys (shared with the owner)
+            name: Unique stage name
+        """
+        super().__init__(name)
+        self._keys_pressed = keys_pressed
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        if isinstance(event, KeyDown) and event.key in self._keys_pressed:
+            return None
+        return event
+
+
+class KeyTracker(Stage):
+    """Records held keys so they can be released if the session ends.
+
+    Registered after injection, so keys dropped by an earlier stage or whose
+    injection failed are never recorded as held.
+    """
+
+    def __init__(self, keys_pressed: set[str], name: str = "key_tracker") -> None:
+        """Initialize tracker.
+
+        Args:
+            keys_pressed: Set of currently held keys (shared with the owner)
+            name: Unique stage name
+        """
+        super().__init__(name)
+        self._keys_pressed = keys_pressed
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        if isinstance(event, KeyDown):
+            self._keys_pressed.add(event.key)
+        elif isinstance(event, KeyUp):
+            self._keys_pressed.discard(event.key)
+        return event
+
+
+class MouseButtonTracker(Stage):
+    """Tracks held mouse buttons so they can be released if the session ends.
+
+    Registered after injection, like KeyTracker.
+    """
+
+    def __init__(self, buttons_held: set[str], name: str = "mouse_button_tracker") -> None:
+        """Initialize tracker.
+
+        Args:
+            buttons_held: Set of currently held buttons (shared with the owner)
+            name: Unique stage name
+        """
+        super().__init__(name)
+        self._buttons_held = buttons_held
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        if isinstance(event, MouseDown):
+            self._buttons_held.add(event.button)
+        elif isinstance(event, MouseUp):
+            self._buttons_held.discard(event.button)
+        return event
+
+
+class KeyRepeatStage(Stage):
+    """Starts server-side key repeat on key_down and stops it on key_up."""
+
+    def __init__(self, repeat_manager: "KeyRepeatManager", name: str = "key_repeat") -> None:
+        super().__init__(name)
+        self._repeat_manager = repeat_manager
+
+    async def process(self, event: InputEvent) -> InputEvent | None:
+        if isinstance(event, KeyDown):
+            self._repeat_manager.start_repeat(event.key, event.code)
+        elif isinstance(event, KeyUp):
+            self._repeat_manager.stop_repeat(event.key)
+        return event
+
+
+class Pipeline:
+    """Ordered stages per message type with per-stage timing.
+
+    Each message type has its own list of stages (the dispatch table), and a
+    stage instance may be registered for several types. Events run through
+    the stages for their type in order until one drops them.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty pipeline."""
+        self._dispatch: dict[MessageType, list[Stage]] = {t: [] for t in INPUT_TYPES}
+
+    def add_stage(self, stage: Stage, *types: MessageType, before: str | None = None) -> None:
+        """Register a stage for the given message types.
+
+        Args:
+            stage: Stage to add
+            *types: Message types the stage applies to (all input types if omitted)
+            before: Name of an existing stage to insert in front of (appends if
+                    None or not present for a type)
+        """
+        for msg_type in types or INPUT_TYPES:
+            stages = self._dispatch.setdefault(msg_type, [])
+            index = next((i for i, s in enumerate(stages) if s.name == before), len(stages))
+            stages.insert(index, stage)
+
+    def remove_stage(self, name: str) -> None:
+        """Remove a stage by name from every message type."""
+        for msg_type, stages in self._dispatch.items():
+            self._dispatch[msg_type] = [s for s in stages if s.name != name]
+
+    def stages(self, msg_type: MessageType) -> list[str]:
+        """Return the ordered stage names for a message type."""
+        return [s.name for s in self._dispatch.get(msg_type, [])]
+
+    async def process(self, event: InputEvent) -> bool:
+        """Run an event through the stages for its type.
+
+        Args:
+            event: Decoded input event
+
+        Returns:
+            True if the event passed every stage, False if one dropped it
+        """
+        current: InputEvent | None = event
+        for stage in self._dispatch.get(event.type, ()):
+            stats = stage.stats
+            start = time.perf_counter_ns()
+            try:
+                current = await stage.process(current)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                stats.calls += 1
+                stats.total_ns += elapsed
+                if elapsed > stats.max_ns:
+                    stats.max_ns = elapsed
+            if current is None:
+                stats.dropped += 1
+                return False
+        return True
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return a snapshot of timing counters for every stage."""
+        unique: dict[str, Stage] = {}
+        for stages in self._dispatch.values():
+            for stage in stages:
+                unique.setdefault(stage.name, stage)
+        return {name: stage.stats.as_dict() for name, stage in unique.items()}
+
+
+def build_default_pipeline(
+    controller: "InputBackend",
+    repeat_manager: "KeyRepeatManager | None" = None,
+    keys_pressed: set[str] | None = None,
+    cursor_feedback: "CursorFeedback | None" = None,
+    buttons_held: set[str] | None = None,
+) -> Pipeline:
+    """Build the standard WHIP pipeline: key/button state tracking, repeat and injection.
+
+    Args:
+        controller: Input backend that performs the injection
+        repeat_manager: Optional KeyRepeatManager for server-side key repeat
+        keys_pressed: Set of held keys to track (a new set if None)
+        cursor_feedback: Optional CursorFeedback notified after mouse injection
+        buttons_held: Set of held mouse buttons to track (a new set if None)
+
+    Returns:
+        Pipeline with stages registered for every input type
+    """
+    pipeline = Pipeline()
+    on_mouse = cursor_feedback.record_injection if cursor_feedback is not None else None
+
+    keys_pressed = keys_pressed if keys_pressed is not None else set()
+    pipeline.add_stage(KeyRepeatFilter(keys_pressed), MessageType.KEY_DOWN, MessageType.KEY_UP)
+
+    def inject_move(event: MouseMove) -> None:
+        controller.move_mouse(event.x, event.y)
+
+    def inject_down(event: MouseDown) -> None:
+        controller.mouse_down(event.button, event.x, event.y)
+
+    def inject_up(event: MouseUp) -> None:
+        controller.mouse_up(event.button, event.x, event.y)
+
+    def inject_key_down(event: KeyDown) -> None:
+        controller.key_down(event.key, event.code)
+
+    def inject_key_up(event: KeyUp) -> None:
+        controller.key_up(event.key, event.code)
+
+    pipeline.add_stage(InjectStage("inject_mouse_move", inject_move, on_mouse), MessageType.MOUSE_MOVE)
+    pipeline.add_stage(InjectStage("inject_mouse_down", inject_down, on_mouse), MessageType.MOUSE_DOWN)
+    pipeline.add_stage(InjectStage("inject_mouse_up", inject_up, on_mouse), MessageType.MOUSE_UP)
+
+    # After injection, so dropped or failed presses are never recorded as held
+    button_tracker = MouseButtonTracker(buttons_held if buttons_held is not None else set())
+    pipeline.add_stage(button_tracker, MessageType.MOUSE_DOWN, MessageType.MOUSE_UP)
+
+    # key_down: inject, record, then start repeat; key_up: stop repeat,
+    # release, then record. Held state is only updated once injection succeeds.
+    key_tracker = KeyTracker(keys_pressed)
+    pipeline.add_stage(InjectStage("inject_key_down", inject_key_down), MessageType.KEY_DOWN)
+    pipeline.add_stage(key_tracker, MessageType.KEY_DOWN)
+    if repeat_manager is not None:
+        repeat_stage = KeyRepeatStage(repeat_manager)
+        pipeline.add_stage(repeat_stage, MessageType.KEY_DOWN)
+        pipeline.add_stage(repeat_stage, MessageType.KEY_UP)
+    pipeline.add_stage(InjectStage("inject_key_up", inject_key_up), MessageType.KEY_UP)
+    pipeline.add_stage(key_tracker, MessageType.KEY_UP)
+
+    return pipeline
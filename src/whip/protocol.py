@@ -3,10 +3,16 @@
 This module defines the JSON message protocol for bidirectional communication
 between the browser client and server. It supports mouse events (move, down, up)
 and keyboard events (down, up), along with control messages (echo, ping, pong).
+The server also pushes cursor feedback messages so the client can reconcile its
+locally predicted cursor against the real host position.
+
+Incoming messages are decoded (see whip.decoder) into the slotted event
+classes defined at the bottom of this module before they are queued.
 """
 
+from dataclasses import dataclass
 from enum import StrEnum
-from typing import TypedDict, Any
+from typing import ClassVar, TypedDict, Any
 
 
 class MessageType(StrEnum):
@@ -20,6 +26,14 @@ class MessageType(StrEnum):
     ECHO = "echo"  # For testing
     PING = "ping"
     PONG = "pong"
+    CURSOR = "cursor"  # Server -> client cursor feedback
+    ERROR = "error"  # Server -> client rejection of a malformed message
+    SESSION = "session"  # Server -> client session token and resume point
+    # Clipboard channel (/ws/clipboard), both directions
+    CLIPBOARD_BEGIN = "clipboard_begin"  # Transfer metadata, followed by binary chunks
+    CLIPBOARD_END = "clipboard_end"
+    CLIPBOARD_ACK = "clipboard_ack"
+    CLIPBOARD_PULL = "clipboard_pull"  # Client -> server request for the host clipboard
 
 
 class MouseMoveData(TypedDict):
@@ -36,6 +50,7 @@ class MouseButtonData(TypedDict):
     button: str  # "left", "right", or "middle"
     x: float  # Normalized X coordinate at click location
     y: float  # Normalized Y coordinate at click location
+    timestamp: float  # Client-side timestamp (milliseconds since epoch)
 
 
 class KeyData(TypedDict):
@@ -43,6 +58,16 @@ class KeyData(TypedDict):
 
     key: str  # Key value (e.g., "a", "Enter", "ArrowUp")
     code: str  # Physical key code (e.g., "KeyA", "Enter", "ArrowUp")
+    timestamp: float  # Client-side timestamp (milliseconds since epoch)
+
+
+class CursorData(TypedDict):
+    """Payload for server-pushed cursor feedback."""
+
+    x: float  # Actual normalized X coordinate of the host cursor
+    y: float  # Actual normalized Y coordinate of the host cursor
+    timestamp: float  # Server-side injection timestamp (milliseconds since epoch)
+    injected: bool  # False if the cursor was moved locally on the host
 
 
 class EchoData(TypedDict):
@@ -51,6 +76,28 @@ class EchoData(TypedDict):
     message: str  # Test message content
 
 
+class PingData(TypedDict):
+    """Payload for timestamped ping messages (either direction)."""
+
+    t0: float  # Sender-side send time (milliseconds since epoch)
+
+
+class PongData(TypedDict):
+    """Payload for timestamped pong replies (NTP-style exchange)."""
+
+    t0: float  # Original ping send time, echoed back
+    t1: float  # Responder-side ping receive time
+    t2: float  # Responder-side pong send time
+
+
+class SessionData(TypedDict):
+    """Payload for the session message sent on (re)connect."""
+
+    token: str  # Session token to present when reconnecting (?session=...)
+    last_seq: int  # Highest event sequence number already processed
+    resumed: bool  # True if an earlier session was resumed
+
+
 class Message(TypedDict):
     """Generic message structure for WebSocket protocol."""
 
@@ -86,11 +133,110 @@ def parse_message(raw: dict[str, Any]) -> Message:
         ValueError: If message type is invalid
     """
     msg_type = raw.get("type")
-    if msg_type not in MessageType.__members__.values():
-        raise ValueError(f"Invalid message type: {msg_type}")
+    try:
+        msg_type = MessageType(msg_type)
+    except ValueError:
+        raise ValueError(f"Invalid message type: {msg_type}") from None
 
     return {
-        "type": MessageType(msg_type),
+        "type": msg_type,
         "data": raw.get("data", {}),
         "timestamp": raw.get("timestamp"),
     }
+
+
+@dataclass(slots=True)
+class MouseMove:
+    """Decoded mouse move event."""
+
+    type: ClassVar[MessageType] = MessageType.MOUSE_MOVE
+
+    x: float  # Normalized X coordinate (0.0-1.0)
+    y: float  # Normalized Y coordinate (0.0-1.0)
+    timestamp: float | None = None  # Client-side timestamp (milliseconds since epoch)
+    received_at: float | None = None  # Server-side receive timestamp
+    seq: int | None = None  # Client sequence number (for dedup on resume)
+
+
+@dataclass(slots=True)
+class MouseButton:
+    """Decoded mouse button event (base for down/up)."""
+
+    button: str  # "left", "right", or "middle"
+    x: float | None  # Normalized X coordinate, None to act at current position
+    y: float | None  # Normalized Y coordinate, None to act at current position
+    timestamp: float | None = None
+    received_at: float | None = None
+    seq: int | None = None
+
+
+@dataclass(slots=True)
+class MouseDown(MouseButton):
+    """Decoded mouse button press."""
+
+    type: ClassVar[MessageType] = MessageType.MOUSE_DOWN
+
+
+@dataclass(slots=True)
+class MouseUp(MouseButton):
+    """Decoded mouse button release."""
+
+    type: ClassVar[MessageType] = MessageType.MOUSE_UP
+
+
+@dataclass(slots=True)
+class KeyEvent:
+    """Decoded keyboard event (base for down/up)."""
+
+    key: str  # Key value (e.g., "a", "Enter", "ArrowUp")
+    code: str  # Physical key code (e.g., "KeyA", "Enter", "ArrowUp")
+    timestamp: float | None = None
+    received_at: float | None = None
+    seq: int | None = None
+
+
+@dataclass(slots=True)
+class KeyDown(KeyEvent):
+    """Decoded key press."""
+
+    type: ClassVar[MessageType] = MessageType.KEY_DOWN
+
+
+@dataclass(slots=True)
+class KeyUp(KeyEvent):
+    """Decoded key release."""
+
+    type: ClassVar[MessageType] = MessageType.KEY_UP
+
+
+@dataclass(slots=True)
+class Ping:
+    """Decoded client-initiated ping."""
+
+    type: ClassVar[MessageType] = MessageType.PING
+
+    t0: float | None = None  # Client send time, echoed back in the pong
+
+
+@dataclass(slots=True)
+class Pong:
+    """Decoded reply to a server clock sync ping."""
+
+    type: ClassVar[MessageType] = MessageType.PONG
+
+    t0: float
+    t1: float
+    t2: float
+
+
+@dataclass(slots=True)
+class Echo:
+    """Decoded echo test message."""
+
+    type: ClassVar[MessageType] = MessageType.ECHO
+
+    data: dict[str, Any]
+
+
+InputEvent = MouseMove | MouseDown | MouseUp | KeyDown | KeyUp
+Event = InputEvent | Ping | Pong | Echo
@@ -3,65 +3,158 @@
 This module provides an event queue with intelligent handling of different
 event types to optimize performance and maintain correctness:
 - Mouse movement: Deduplicates to keep only latest position (prevents lag)
+- Mouse drags: Keeps a simplified polyline while a button is held (preserves shape)
 - Keyboard events: Strict FIFO ordering with no drops (guarantees correctness)
 """
 
 import asyncio
+import math
 from collections import deque
-from whip.protocol import MessageType
+from whip.protocol import InputEvent, MessageType, MouseButton, MouseMove
+
+# Screen size assumed for drag simplification until the real one is known
+DEFAULT_SCREEN_SIZE = (1920, 1080)
+
+
+def simplify_path(points: list[tuple[float, float]], tolerance: float) -> list[int]:
+    """Simplify a polyline using the Ramer-Douglas-Peucker algorithm.
+
+    Args:
+        points: Polyline vertices in pixel coordinates
+        tolerance: Maximum allowed perpendicular deviation in pixels
+
+    Returns:
+        Sorted indices of the vertices to keep (always includes both endpoints)
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+
+    # Iterative to avoid recursion limits on very long drags
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        (x1, y1), (x2, y2) = points[start], points[end]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+
+        max_dist = -1.0
+        max_index = start
+        for i in range(start + 1, end):
+            px, py = points[i]
+            if length == 0:
+                dist = math.hypot(px - x1, py - y1)
+            else:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / length
+            if dist > max_dist:
+                max_dist = dist
+                max_index = i
+
+        if max_dist > tolerance:
+            keep[max_index] = True
+            stack.append((start, max_index))
+            stack.append((max_index, end))
+
+    return [i for i, kept in enumerate(keep) if kept]
 
 
 class EventQueue:
     """
     Smart event queue for bridging async WebSocket to sync pynput.
 
-    Mouse move dedup: When new mouse_move arrives, replace ALL pending
-    mouse_move events with the latest position. Only most recent position
-    matters to minimize replay lag.
+    Mouse move dedup: When new mouse_move arrives while no button is held,
+    replace ALL pending mouse_move events with the latest position. Only most
+    recent position matters to minimize replay lag.
+
+    Drag simplification: While a mouse button is held, mouse_move events are
+    collected into a path instead. When the path is flushed it is reduced with
+    Ramer-Douglas-Peucker, so drags keep their shape with few injected points.
 
     Keyboard FIFO: Strict order preservation. Every key_down and key_up
     processed in exact order received - no skipping ever.
     """
 
-    def __init__(self):
-        self._queue: deque = deque()
-        self._latest_mouse_pos: dict | None = None  # Track latest mouse position
-        self._has_pending_mouse: bool = False
+    def __init__(self, drag_tolerance: float = 2.0, screen_size: tuple[int, int] = DEFAULT_SCREEN_SIZE):
+        """Initialize queue.
+
+        Args:
+            drag_tolerance: Maximum deviation of a simplified drag path, in pixels
+            screen_size: Screen (width, height) used to convert normalized coordinates
+        """
+        self._queue: deque[InputEvent] = deque()
+        self._latest_mouse_pos: MouseMove | None = None  # Pending hover position (dedup)
+        self._buttons_held: set[str] = set()
+        self._drag_path: list[MouseMove] = []  # Pending moves while a button is held
+        self._drag_anchor: tuple[float, float] | None = None  # Last point already queued
+        self._drag_tolerance = drag_tolerance
+        self._screen_size = screen_size
         self._lock = asyncio.Lock()
 
-    async def put(self, event: dict) -> None:
+    def set_screen_size(self, width: int, height: int) -> None:
+        """Set the screen size used to apply the drag tolerance in pixels."""
+        self._screen_size = (width, height)
+
+    async def put(self, event: InputEvent) -> None:
         """Add event to queue with smart deduplication."""
         async with self._lock:
-            event_type = event.get("type")
-
-            if event_type == MessageType.MOUSE_MOVE:
-                # Replace pending mouse position (dedup)
-                self._latest_mouse_pos = event
-                self._has_pending_mouse = True
+            if isinstance(event, MouseMove):
+                if self._buttons_held:
+                    # Dragging: keep the path, simplified on flush
+                    self._drag_path.append(event)
+                else:
+                    # Replace pending mouse position (dedup)
+                    self._latest_mouse_pos = event
             else:
                 # Keyboard and other events: strict FIFO
-                # First, flush any pending mouse position
-                if self._has_pending_mouse:
-                    self._queue.append(self._latest_mouse_pos)
-                    self._has_pending_mouse = False
-                    self._latest_mouse_pos = None
+                # First, flush any pending mouse position or drag path
+                self._flush_mouse()
                 self._queue.append(event)
 
-    async def get(self) -> dict | None:
+                if isinstance(event, MouseButton):
+                    if event.type == MessageType.MOUSE_DOWN:
+                        self._buttons_held.add(event.button)
+                        self._drag_anchor = self._pixel(event)
+                    else:
+                        self._buttons_held.discard(event.button)
+
+    def _pixel(self, event: MouseMove | MouseButton) -> tuple[float, float]:
+        """Convert an event's normalized coordinates to pixels."""
+        width, height = self._screen_size
+        return (event.x or 0.0) * width, (event.y or 0.0) * height
+
+    def _flush_mouse(self) -> None:
+        """Move any pending mouse position or simplified drag path into the queue."""
+        if self._latest_mouse_pos is not None:
+            self._queue.append(self._latest_mouse_pos)
+            self._latest_mouse_pos = None
+
+        if self._drag_path:
+            points = [self._pixel(event) for event in self._drag_path]
+            if self._drag_anchor is not None:
+                # Anchor at the last queued point so the first segment is judged too
+                kept = simplify_path([self._drag_anchor] + points, self._drag_tolerance)
+                kept = [i - 1 for i in kept if i > 0]
+            else:
+                kept = simplify_path(points, self._drag_tolerance)
+            for i in kept:
+                self._queue.append(self._drag_path[i])
+            self._drag_anchor = points[-1]
+            self._drag_path = []
+
+    async def get(self) -> InputEvent | None:
         """Get next event from queue. Returns None if empty."""
         async with self._lock:
-            # Check for pending mouse position first
-            if self._has_pending_mouse:
-                event = self._latest_mouse_pos
-                self._has_pending_mouse = False
-                self._latest_mouse_pos = None
-                return event
+            # Queued events are older than any pending mouse position
+            if not self._queue:
+                self._flush_mouse()
 
             if self._queue:
                 return self._queue.popleft()
             return None
 
-    async def get_blocking(self, timeout: float = 0.1) -> dict | None:
+    async def get_blocking(self, timeout: float = 0.1) -> InputEvent | None:
         """Get next event, waiting up to timeout if queue is empty."""
         event = await self.get()
         if event is not None:
@@ -71,15 +164,34 @@ class EventQueue:
         await asyncio.sleep(timeout)
         return await self.get()
 
+    def clear(self) -> int:
+        """Discard all pending events and button state.
+
+        Returns:
+            Number of events discarded
+        """
+        discarded = self.backlog_size
+        self._queue.clear()
+        self._latest_mouse_pos = None
+        self._drag_path = []
+        self._drag_anchor = None
+        self._buttons_held.clear()
+        return discarded
+
     @property
     def backlog_size(self) -> int:
         """Return number of pending events for monitoring."""
-        size = len(self._queue)
-        if self._has_pending_mouse:
+        size = len(self._queue) + len(self._drag_path)
+        if self._latest_mouse_pos is not None:
             size += 1
         return size
 
+    @property
+    def dragging(self) -> bool:
+        """Check if a mouse button is held (moves form a drag path)."""
+        return bool(self._buttons_held)
+
     @property
     def has_pending(self) -> bool:
         """Check if queue has any pending events."""
-        return bool(self._queue) or self._has_pending_mouse
+        return bool(self._queue) or self._latest_mouse_pos is not None or bool(self._drag_path)
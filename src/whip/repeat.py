@@ -7,7 +7,10 @@ key_down events at a consistent rate until the key is released.
 """
 
 import asyncio
-from whip.controller import InputController
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from whip.backend import InputBackend
 
 
 class KeyRepeatManager:
@@ -17,11 +20,11 @@ class KeyRepeatManager:
     by periodic repeats at a fixed rate. Each held key gets its own task.
     """
 
-    def __init__(self, controller: InputController) -> None:
+    def __init__(self, controller: "InputBackend") -> None:
         """Initialize repeat manager.
 
         Args:
-            controller: InputController instance to send key events
+            controller: Input backend to send key events
         """
         self._controller = controller
         self._repeat_tasks: dict[str, asyncio.Task] = {}
@@ -55,6 +58,17 @@ class KeyRepeatManager:
             task.cancel()
             del self._repeat_tasks[key]
 
+    def stop_all(self) -> None:
+        """Stop repeating every key (e.g. when the session ends)."""
+        for task in self._repeat_tasks.values():
+            task.cancel()
+        self._repeat_tasks.clear()
+
+    @property
+    def repeating(self) -> set[str]:
+        """Return the keys currently repeating."""
+        return set(self._repeat_tasks)
+
     async def _repeat_key_loop(self, key: str, code: str) -> None:
         """Async loop that sends repeated key_down events.
 
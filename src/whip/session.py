@@ -0,0 +1,331 @@
+"""Per-connection session state and resource reclamation.
+
+This module provides the Session class, which owns everything a single
+WebSocket client can leave behind on the host: its event queue, held keys
+and mouse buttons, key repeat tasks, clock sync and consumer task. When the
+client disconnects or times out, closing the session cancels its tasks,
+flushes queued events and releases every key and button it still holds.
+"""
+
+import asyncio
+import logging
+import secrets
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from whip.clock import ClockSync
+from whip.pipeline import Pipeline, build_default_pipeline
+from whip.protocol import InputEvent, KeyDown, MouseDown, MouseMove
+from whip.queue import DEFAULT_SCREEN_SIZE, EventQueue
+from whip.repeat import KeyRepeatManager
+
+if TYPE_CHECKING:
+    from fastapi import WebSocket
+    from whip.backend import InputBackend
+    from whip.cursor import CursorFeedback
+
+logger = logging.getLogger(__name__)
+
+# Browsers don't auto-repeat these, so a modifier released on disconnect is
+# never pressed again by the client after it resumes
+MODIFIER_KEYS = frozenset({
+    "Shift", "ShiftLeft", "ShiftRight",
+    "Control", "ControlLeft", "ControlRight",
+    "Alt", "AltLeft", "AltRight",
+    "Meta", "MetaLeft", "MetaRight",
+})
+
+
+@dataclass(slots=True)
+class LatencyStats:
+    """One-way network delay and stale mouse move counters for a session."""
+
+    samples: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    stale_moves: int = 0
+    stale_dropped: int = 0
+
+    def record(self, delay: float) -> None:
+        """Record the one-way delay of one input event in milliseconds."""
+        self.samples += 1
+        self.total_ms += delay
+        if delay > self.max_ms:
+            self.max_ms = delay
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a JSON-serializable snapshot."""
+        return {
+            "samples": self.samples,
+            "mean_delay_ms": round(self.total_ms / self.samples, 1) if self.samples else None,
+            "max_delay_ms": round(self.max_ms, 1),
+            "stale_moves": self.stale_moves,
+            "stale_dropped": self.stale_dropped,
+        }
+
+
+@dataclass(slots=True)
+class ResumeState:
+    """What a closed session hands over to the session that resumes it."""
+
+    last_seq: int  # Highest sequence number processed
+    modifiers: list[str]  # Modifier keys released on close
+    buttons: list[str]  # Mouse buttons released on close
+    position: tuple[float, float] | None  # Cursor position when buttons were released
+
+    @classmethod
+    def from_session(cls, session: "Session") -> "ResumeState":
+        """Capture the resume state of a closed session."""
+        return cls(session.processed_seq, session.released_modifiers, session.released_buttons,
+                   session.release_position)
+
+
+class Session:
+    """State owned by one connected client.
+
+    The session's pipeline writes held keys and buttons into sets owned here,
+    so close() knows exactly what must be released on the host.
+    """
+
+    def __init__(
+        self,
+        websocket: "WebSocket",
+        controller: "InputBackend | None",
+        cursor_feedback: "CursorFeedback | None" = None,
+        session_id: str | None = None,
+        last_seq: int = 0,
+        configure_pipeline: Callable[[Pipeline], None] | None = None,
+    ) -> None:
+        """Initialize session.
+
+        Args:
+            websocket: Connected client WebSocket
+            controller: Input backend for injection, or None if unavailable
+            cursor_feedback: Optional CursorFeedback notified after mouse injection
+            session_id: Token of a session being resumed (a new one if None)
+            last_seq: Highest sequence number already processed when resuming
+                      (events at or below it are treated as duplicates)
+            configure_pipeline: Optional callback that adds site-specific stages
+                                to the session's default pipeline
+        """
+        self.id = session_id or secrets.token_urlsafe(16)
+        self.last_seq = last_seq  # Highest sequence number accepted (queued)
+        self.processed_seq = last_seq  # Highest sequence number through the pipeline
+        self.websocket = websocket
+        self.clock = ClockSync()
+        self.keys_pressed: set[str] = set()
+        self.buttons_held: set[str] = set()
+        self.latency = LatencyStats()
+        self._held_move: MouseMove | None = None  # Newest stale move, not yet queued
+        self._controller = controller
+        self._tasks: list[asyncio.Task] = []
+        self._consumer: asyncio.Task | None = None
+        self._stopping = False
+        self._closed = False
+        self.released_modifiers: list[str] = []  # Held modifiers released by close()
+        self.released_buttons: list[str] = []  # Held mouse buttons released by close()
+        self.release_position: tuple[float, float] | None = None
+
+        screen_size = DEFAULT_SCREEN_SIZE
+        if controller is not None:
+            screen_size = (controller._screen_width, controller._screen_height)
+        self.queue = EventQueue(screen_size=screen_size)
+
+        self.repeat_manager: KeyRepeatManager | None = None
+        self.pipeline: Pipeline | None = None
+        if controller is not None:
+            self.repeat_manager = KeyRepeatManager(controller)
+            self.pipeline = build_default_pipeline(
+                controller, self.repeat_manager, self.keys_pressed, cursor_feedback, self.buttons_held
+            )
+            if configure_pipeline is not None:
+                configure_pipeline(self.pipeline)
+
+    def start(self) -> None:
+        """Start the session's background tasks (clock sync and event consumer)."""
+        self._tasks.append(asyncio.create_task(self.clock.run(self.websocket.send_json)))
+        if self.pipeline is not None:
+            self._consumer = asyncio.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        """Drain the session queue through its processing pipeline until stopped.
+
+        Stops between events rather than being cancelled, so an injection
+        running in the executor always completes before close() releases
+        held input.
+        """
+        assert self.pipeline is not None
+        while not self._stopping:
+            event = await self.queue.get_blocking(timeout=0.05)
+            if event is None or self._stopping:
+                continue
+
+            try:
+                await self.pipeline.process(event)
+            except Exception as e:
+                logger.error(f"Event processing failed: {e}", exc_info=True)
+            # The queue only coalesces or simplifies, never reorders, so every
+            # earlier sequence number has been handled too
+            if event.seq is not None and event.seq > self.processed_seq:
+                self.processed_seq = event.seq
+
+    async def submit(self, event: InputEvent, stale: bool = False) -> None:
+        """Queue an input event, holding back a stale mouse move.
+
+        A stale move (one that spent too long on the network) is only dropped
+        once a newer move supersedes it, so the last move of a late burst is
+        still injected. Call flush_held_move() when no newer move arrives.
+        Stale moves during a drag are queued as usual so the drag keeps its
+        shape.
+
+        Args:
+            event: Decoded input event
+            stale: Whether the event's one-way delay exceeded the stale threshold
+        """
+        if isinstance(event, MouseMove):
+            if self._held_move is not None:
+                self._held_move = None
+                self.latency.stale_dropped += 1
+            if stale:
+                self.latency.stale_moves += 1
+                # Drag points are never dropped: the queue simplifies the path
+                if not self.queue.dragging:
+                    self._held_move = event
+                    return
+        else:
+            await self.flush_held_move()
+        await self.queue.put(event)
+
+    @property
+    def has_held_move(self) -> bool:
+        """Check whether a stale mouse move is waiting to be superseded."""
+        return self._held_move is not None
+
+    async def flush_held_move(self) -> None:
+        """Queue the held stale move: nothing newer arrived to replace it."""
+        if self._held_move is not None:
+            event, self._held_move = self._held_move, None
+            await self.queue.put(event)
+
+    async def restore_input(self, state: ResumeState) -> None:
+        """Press modifiers and mouse buttons again that were held when the previous connection dropped.
+
+        Queued ahead of any replayed events, so a chord or drag interrupted by
+        a reconnect continues with its keys and buttons held.
+
+        Args:
+            state: Resume state of the closed session
+        """
+        for key in state.modifiers:
+            await self.queue.put(KeyDown(key=key, code=""))
+        x, y = state.position if state.position is not None else (None, None)
+        for button in state.buttons:
+            await self.queue.put(MouseDown(button=button, x=x, y=y))
+
+    def accept_seq(self, seq: int | None) -> bool:
+        """Record an event sequence number, rejecting ones already processed.
+
+        Events replayed by the client after a reconnect carry sequence numbers
+        at or below last_seq and must not be injected twice.
+
+        Args:
+            seq: Client sequence number, or None for unsequenced events
+
+        Returns:
+            True if the event is new, False if it is a duplicate
+        """
+        if seq is None:
+            return True
+        if seq <= self.last_seq:
+            return False
+        self.last_seq = seq
+        return True
+
+    @property
+    def closed(self) -> bool:
+        """Check whether the session has been closed."""
+        return self._closed
+
+    async def close(self) -> None:
+        """Release everything the session holds. Safe to call more than once.
+
+        Waits for the event consumer to finish its current event, cancels
+        background tasks and key repeats, discards queued events, then
+        releases held keys and mouse buttons on the host.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        # Cancelling would abandon an in-flight executor injection, which
+        # could then land after the release below and leave input stuck
+        self._stopping = True
+        if self._consumer is not None:
+            await asyncio.gather(self._consumer, return_exceptions=True)
+            self._consumer = None
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        if self.repeat_manager is not None:
+            self.repeat_manager.stop_all()
+
+        discarded = self.queue.clear()
+        self._held_move = None
+        keys = sorted(self.keys_pressed)
+        buttons = sorted(self.buttons_held)
+        self.released_modifiers = [key for key in keys if key in MODIFIER_KEYS]
+        self.released_buttons = buttons
+        self.keys_pressed.clear()
+        self.buttons_held.clear()
+
+        if self._controller is not None and (keys or buttons):
+            self.release_position = await asyncio.get_running_loop().run_in_executor(
+                None, self._release, keys, buttons
+            )
+
+        logger.info(
+            f"Session {self.id[:8]} closed: discarded {discarded} events, "
+            f"released keys={keys} buttons={buttons}"
+        )
+
+    def _release(self, keys: list[str], buttons: list[str]) -> tuple[float, float] | None:
+        """Release held keys and buttons on the host (runs in executor).
+
+        Returns:
+            Cursor position where buttons were released, or None
+        """
+        assert self._controller is not None
+        position = None
+        if buttons:
+            try:
+                position = self._controller.get_position()
+            except Exception as e:
+                logger.error(f"Failed to read cursor position: {e}")
+        for key in keys:
+            try:
+                self._controller.key_up(key, "")
+            except Exception as e:
+                logger.error(f"Failed to release key {key!r}: {e}")
+        for button in buttons:
+            try:
+                self._controller.mouse_up(button, None, None)
+            except Exception as e:
+                logger.error(f"Failed to release button {button!r}: {e}")
+        return position
+
+    def stats(self) -> dict[str, Any]:
+        """Return a snapshot of queue, clock and pipeline state."""
+        return {
+            "queue_size": self.queue.backlog_size,
+            "last_seq": self.last_seq,
+            "processed_seq": self.processed_seq,
+            "keys_pressed": sorted(self.keys_pressed),
+            "buttons_held": sorted(self.buttons_held),
+            "clock_offset_ms": self.clock.offset if self.clock.synced else None,
+            "rtt_ms": self.clock.rtt,
+            "latency": self.latency.as_dict(),
+            "pipeline": self.pipeline.stats() if self.pipeline is not None else {},
+        }
@@ -0,0 +1,48 @@
+"""Fixtures and stand-in backends shared by the test modules."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import whip.main
+
+
+class RecordingController:
+    """Stand-in controller that records calls instead of injecting."""
+
+    _screen_width = 1000
+    _screen_height = 1000
+
+    def __init__(self):
+        self.calls = []
+
+    def move_mouse(self, x, y):
+        self.calls.append(("move", x, y))
+
+    def get_position(self):
+        return (0.0, 0.0)
+
+    def mouse_down(self, button, x, y):
+        self.calls.append(("mouse_down", button))
+
+    def mouse_up(self, button, x, y):
+        self.calls.append(("mouse_up", button, x, y))
+
+    def key_down(self, key, code):
+        self.calls.append(("key_down", key))
+
+    def key_up(self, key, code):
+        self.calls.append(("key_up", key))
+
+
+@pytest.fixture
+def controller():
+    """RecordingController for driving pipelines and sessions directly."""
+    return RecordingController()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient running the app with the non-injecting backend."""
+    monkeypatch.setenv("WHIP_BACKEND", "null")
+    with TestClient(whip.main.app) as client:
+        yield client
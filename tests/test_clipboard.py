@@ -0,0 +1,215 @@
+"""Tests for chunked clipboard transfers and the clipboard WebSocket."""
+
+import asyncio
+import gzip
+import json
+import time
+
+import pytest
+
+import whip.main
+from whip.clipboard import (
+    ClipboardError,
+    ClipboardSync,
+    ClipboardTransfer,
+    MemoryClipboard,
+    encode_payload,
+)
+
+
+def test_transfer_assembles_chunks():
+    """Chunks are joined in order."""
+    transfer = ClipboardTransfer("t1", "text/plain", 11, "identity")
+    transfer.add_chunk(b"hello ")
+    transfer.add_chunk(b"world")
+    assert transfer.finish() == b"hello world"
+
+
+def test_transfer_gzip_round_trip():
+    """encode_payload output decodes back to the original payload."""
+    data = b"clipboard " * 1000
+    encoding, encoded = encode_payload(data)
+    assert encoding == "gzip"
+    assert len(encoded) < len(data)
+
+    transfer = ClipboardTransfer("t1", "text/plain", len(data), encoding)
+    for offset in range(0, len(encoded), 100):
+        transfer.add_chunk(encoded[offset:offset + 100])
+    assert transfer.finish() == data
+
+
+def test_small_or_incompressible_payload_sent_as_identity():
+    """Compression is skipped when it would not help."""
+    assert encode_payload(b"short") == ("identity", b"short")
+
+
+def test_transfer_rejects_invalid_metadata():
+    """Unknown types, encodings and oversized declarations are rejected up front."""
+    with pytest.raises(ClipboardError):
+        ClipboardTransfer("t1", "application/octet-stream", 10, "identity")
+    with pytest.raises(ClipboardError):
+        ClipboardTransfer("t1", "text/plain", 10, "brotli")
+    with pytest.raises(ClipboardError):
+        ClipboardTransfer("t1", "text/plain", 101, "identity", max_bytes=100)
+    # Unhashable or mistyped JSON values are rejected, not raised as TypeError
+    with pytest.raises(ClipboardError):
+        ClipboardTransfer("t1", ["text/plain"], 10, "identity")
+    with pytest.raises(ClipboardError):
+        ClipboardTransfer("t1", "text/plain", 10, {"gzip": True})
+    with pytest.raises(ClipboardError):
+        ClipboardTransfer("t1", "text/plain", True, "identity")
+
+
+def test_transfer_rejects_too_many_chunk_bytes():
+    """Receiving more bytes than the limit aborts the transfer."""
+    transfer = ClipboardTransfer("t1", "text/plain", 100, "identity", max_bytes=100)
+    transfer.add_chunk(b"x" * 100)
+    with pytest.raises(ClipboardError):
+        transfer.add_chunk(b"x")
+
+
+def test_transfer_rejects_gzip_bomb():
+    """Decompression stops at the limit instead of expanding without bound."""
+    bomb = gzip.compress(b"\0" * 10_000)
+    transfer = ClipboardTransfer("t1", "text/plain", 100, "gzip", max_bytes=100)
+    transfer.add_chunk(bomb)
+    with pytest.raises(ClipboardError):
+        transfer.finish()
+
+
+def test_transfer_rejects_size_mismatch():
+    """The decoded size must match the declared size."""
+    transfer = ClipboardTransfer("t1", "text/plain", 5, "identity")
+    transfer.add_chunk(b"abc")
+    with pytest.raises(ClipboardError, match="mismatch"):
+        transfer.finish()
+
+
+def send_transfer(ws, transfer_id, mime, data, chunk_size=4096):
+    """Send one chunked clipboard transfer."""
+    encoding, encoded = encode_payload(data)
+    ws.send_json({"type": "clipboard_begin", "data": {
+        "id": transfer_id, "mime": mime, "size": len(data), "encoding": encoding,
+    }})
+    for offset in range(0, len(encoded), chunk_size):
+        ws.send_bytes(encoded[offset:offset + chunk_size])
+    ws.send_json({"type": "clipboard_end", "data": {"id": transfer_id}})
+
+
+def test_browser_paste_sets_host_clipboard(client):
+    """A chunked transfer is acked and written to the host clipboard."""
+    data = ("line of pasted text\n" * 5000).encode()
+    with client.websocket_connect("/ws/clipboard") as ws:
+        send_transfer(ws, "p1", "text/plain", data)
+        ack = ws.receive_json()
+        assert ack == {"type": "clipboard_ack", "data": {"id": "p1", "ok": True}}
+
+    backend = whip.main.clipboard_sync._backend
+    assert isinstance(backend, MemoryClipboard)
+    assert backend.read() == ("text/plain", data)
+
+
+def test_pull_returns_host_clipboard(client):
+    """clipboard_pull streams the current host clipboard back in chunks."""
+    png = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 64
+    whip.main.clipboard_sync._backend.write("image/png", png)
+
+    with client.websocket_connect("/ws/clipboard") as ws:
+        ws.send_json({"type": "clipboard_pull", "data": {}})
+        begin = ws.receive_json()
+        assert begin["type"] == "clipboard_begin"
+        assert begin["data"]["mime"] == "image/png"
+
+        payload = b""
+        while True:
+            message = ws.receive()
+            if message.get("bytes") is not None:
+                payload += message["bytes"]
+            else:
+                end = json.loads(message["text"])
+                break
+        assert end == {"type": "clipboard_end", "data": {"id": begin["data"]["id"]}}
+
+    if begin["data"]["encoding"] == "gzip":
+        payload = gzip.decompress(payload)
+    assert payload == png
+
+
+def test_invalid_transfer_rejected_without_disconnect(client):
+    """Rejected transfers get a failed ack and the socket stays usable."""
+    with client.websocket_connect("/ws/clipboard") as ws:
+        ws.send_json({"type": "clipboard_begin", "data": {
+            "id": "bad", "mime": "text/html", "size": 3, "encoding": "identity",
+        }})
+        ack = ws.receive_json()
+        assert ack["data"]["ok"] is False
+        assert "Unsupported" in ack["data"]["error"]
+
+        ws.send_json({"type": "clipboard_begin", "data": {
+            "id": "bad2", "mime": ["a"], "size": 3, "encoding": "identity",
+        }})
+        assert ws.receive_json()["data"]["ok"] is False
+
+        send_transfer(ws, "good", "text/plain", b"ok!")
+        assert ws.receive_json()["data"] == {"id": "good", "ok": True}
+
+
+def test_input_socket_unaffected_by_clipboard_transfer(client):
+    """Input events are acked while a large clipboard transfer is in flight."""
+    with client.websocket_connect("/ws/clipboard") as clip, client.websocket_connect("/ws") as ws:
+        clip.send_json({"type": "clipboard_begin", "data": {
+            "id": "big", "mime": "text/plain", "size": 1024 * 1024, "encoding": "identity",
+        }})
+        clip.send_bytes(b"x" * (512 * 1024))
+
+        ws.send_json({"type": "key_down", "data": {"key": "a", "code": "KeyA"}})
+        while (message := ws.receive_json())["type"] != "ack":
+            pass
+        assert message["received"] == "key_down"
+
+        clip.send_bytes(b"x" * (512 * 1024))
+        clip.send_json({"type": "clipboard_end", "data": {"id": "big"}})
+        assert clip.receive_json()["data"]["ok"] is True
+
+
+class SlowCountClipboard(MemoryClipboard):
+    """MemoryClipboard whose change_count blocks, widening the write/poll window."""
+
+    def change_count(self):
+        time.sleep(0.05)
+        return super().change_count()
+
+
+class RecordingWebSocket:
+    """Stand-in WebSocket recording JSON messages."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    async def send_bytes(self, data):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_own_write_not_echoed_by_poller():
+    """A write from the browser is never pushed back while the poller runs."""
+    sync = ClipboardSync(SlowCountClipboard(), poll_interval=0.0)
+    client = RecordingWebSocket()
+    sync._clients.add(client)
+    poller = asyncio.create_task(sync.run())
+    try:
+        await asyncio.sleep(0.1)  # Poller has recorded the initial change count
+        for i in range(3):
+            data = f"paste {i}".encode()
+            transfer = ClipboardTransfer(str(i), "text/plain", len(data), "identity")
+            transfer.add_chunk(data)
+            await sync._apply(client, transfer)
+            await asyncio.sleep(0.1)
+    finally:
+        poller.cancel()
+        await asyncio.gather(poller, return_exceptions=True)
+
+    assert [m["type"] for m in client.sent] == ["clipboard_ack"] * 3
@@ -0,0 +1,48 @@
+"""Unit tests for ClockSync offset and RTT estimation."""
+
+import pytest
+from whip.clock import ClockSync
+
+
+def test_offset_and_rtt_from_symmetric_exchange():
+    """Symmetric delays should yield the exact offset and RTT."""
+    clock = ClockSync()
+
+    # Client clock is 1000ms ahead, 20ms each way, 5ms client processing
+    sample = clock.add_sample(t0=0, t1=1020, t2=1025, t3=45)
+
+    assert sample is not None
+    assert sample.offset == pytest.approx(1000)
+    assert sample.rtt == pytest.approx(40)
+    assert clock.synced
+
+
+def test_lowest_rtt_sample_wins():
+    """A congested (high RTT, asymmetric) sample should not skew the estimate."""
+    clock = ClockSync()
+
+    clock.add_sample(t0=0, t1=1010, t2=1010, t3=20)  # Clean: offset 1000, rtt 20
+    clock.add_sample(t0=100, t1=1300, t2=1300, t3=320)  # Congested uplink
+
+    assert clock.offset == pytest.approx(1000)
+    assert clock.rtt == pytest.approx(20)
+
+
+def test_negative_rtt_rejected():
+    """Impossible exchanges are discarded."""
+    clock = ClockSync()
+
+    assert clock.add_sample(t0=100, t1=0, t2=500, t3=110) is None
+    assert not clock.synced
+
+
+def test_network_delay():
+    """Event delay is measured on the server clock using the offset."""
+    clock = ClockSync()
+
+    assert clock.network_delay(5000, received_at=100) is None
+
+    clock.add_sample(t0=0, t1=1010, t2=1010, t3=20)  # Offset 1000
+
+    # Client sent at its 1050 (server 50), server received at 80
+    assert clock.network_delay(1050, received_at=80) == pytest.approx(30)
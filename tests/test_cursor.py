@@ -0,0 +1,128 @@
+"""Unit tests for CursorFeedback rate-limited, change-only cursor messages."""
+
+import asyncio
+
+import pytest
+from whip.cursor import CursorFeedback
+from whip.protocol import MessageType
+
+
+class FakeController:
+    """Minimal stand-in exposing get_position()."""
+
+    def __init__(self):
+        self.position = (0.5, 0.5)
+
+    def get_position(self):
+        return self.position
+
+
+@pytest.mark.asyncio
+async def test_sends_only_on_change():
+    """Feedback should only be sent when the position changes."""
+    controller = FakeController()
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    feedback = CursorFeedback(controller, send)
+
+    assert await feedback.poll() is True
+    assert await feedback.poll() is False
+    assert len(sent) == 1
+
+    controller.position = (0.25, 0.75)
+    assert await feedback.poll() is True
+    assert len(sent) == 2
+    assert sent[1]["type"] == MessageType.CURSOR
+    assert sent[1]["data"]["x"] == 0.25
+    assert sent[1]["data"]["y"] == 0.75
+
+
+@pytest.mark.asyncio
+async def test_injection_timestamp_reported():
+    """Injected moves carry the injection timestamp; local moves do not."""
+    controller = FakeController()
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    feedback = CursorFeedback(controller, send)
+
+    feedback.record_injection()
+    await feedback.poll()
+    assert sent[0]["data"]["injected"] is True
+    assert sent[0]["data"]["timestamp"] > 0
+
+    # Host user moves the cursor locally without any injection
+    controller.position = (0.1, 0.1)
+    await feedback.poll()
+    assert sent[1]["data"]["injected"] is False
+
+
+@pytest.mark.asyncio
+async def test_unchanged_injection_not_attributed_to_local_move():
+    """An injection that didn't move the cursor doesn't mark the next local move as injected."""
+    controller = FakeController()
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    feedback = CursorFeedback(controller, send)
+    await feedback.poll()
+
+    feedback.record_injection()
+    assert await feedback.poll() is False
+
+    controller.position = (0.2, 0.2)
+    await feedback.poll()
+    assert sent[-1]["data"]["injected"] is False
+
+
+@pytest.mark.asyncio
+async def test_send_current_delivers_unchanged_position():
+    """A newly connected client gets the position even if it hasn't changed."""
+    controller = FakeController()
+    broadcast = []
+    direct = []
+
+    async def send(message):
+        broadcast.append(message)
+
+    async def send_direct(message):
+        direct.append(message)
+
+    feedback = CursorFeedback(controller, send)
+    await feedback.poll()
+    await feedback.send_current(send_direct)
+
+    assert len(broadcast) == 1
+    assert direct[0]["type"] == MessageType.CURSOR
+    assert (direct[0]["data"]["x"], direct[0]["data"]["y"]) == (0.5, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_run_skips_polling_without_clients():
+    """The host cursor isn't sampled while no client is connected."""
+    controller = FakeController()
+    calls = []
+    original = controller.get_position
+    controller.get_position = lambda: calls.append(1) or original()
+    clients = False
+
+    async def send(message):
+        pass
+
+    feedback = CursorFeedback(controller, send, interval=0.01, has_clients=lambda: clients)
+    task = asyncio.create_task(feedback.run())
+    await asyncio.sleep(0.05)
+    assert calls == []
+
+    clients = True
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    assert calls
@@ -0,0 +1,64 @@
+"""Unit tests for the typed WebSocket frame decoder."""
+
+import json
+
+import pytest
+from whip.decoder import DecodeError, decode
+from whip.protocol import KeyDown, MouseMove, MouseUp, Pong
+
+
+def test_decodes_mouse_move():
+    """Valid frames become slotted typed events."""
+    event = decode(json.dumps({"type": "mouse_move", "data": {"x": 0.25, "y": 1, "timestamp": 123.0}}))
+
+    assert isinstance(event, MouseMove)
+    assert (event.x, event.y, event.timestamp) == (0.25, 1.0, 123.0)
+    assert not hasattr(event, "__dict__")
+
+
+def test_mouse_up_outside_canvas_releases_in_place():
+    """The (-1, -1) sentinel decodes to a release without coordinates."""
+    event = decode('{"type": "mouse_up", "data": {"button": "right", "x": -1, "y": -1}}')
+
+    assert isinstance(event, MouseUp)
+    assert event.button == "right"
+    assert event.x is None and event.y is None
+
+
+def test_decodes_key_and_pong():
+    """Keyboard and clock sync messages decode to their event types."""
+    key = decode('{"type": "key_down", "data": {"key": "a", "code": "KeyA"}}')
+    pong = decode('{"type": "pong", "data": {"t0": 1, "t1": 2, "t2": 3}}')
+
+    assert isinstance(key, KeyDown) and key.key == "a"
+    assert isinstance(pong, Pong) and (pong.t0, pong.t1, pong.t2) == (1.0, 2.0, 3.0)
+
+
+@pytest.mark.parametrize("frame", [
+    "not json",
+    "[]",
+    '{"type": "teleport", "data": {}}',
+    '{"type": ["mouse_move"], "data": {}}',
+    '{"type": "mouse_move", "data": []}',
+    '{"type": "mouse_move", "data": {"x": 1.5, "y": 0.5}}',
+    '{"type": "mouse_move", "data": {"x": "0.5", "y": 0.5}}',
+    '{"type": "mouse_move", "data": {"x": true, "y": 0.5}}',
+    '{"type": "mouse_move", "data": {"x": NaN, "y": 0.5}}',
+    '{"type": "mouse_down", "data": {"button": "thumb", "x": 0.5, "y": 0.5}}',
+    '{"type": "key_down", "data": {"key": "", "code": "KeyA"}}',
+    '{"type": "key_down", "data": {"key": 65, "code": "KeyA"}}',
+    '{"type": "pong", "data": {"t0": 1, "t1": 2}}',
+])
+def test_rejects_malformed_frames(frame):
+    """Malformed input is rejected with DecodeError."""
+    with pytest.raises(DecodeError):
+        decode(frame)
+
+
+def test_sequence_number_attached_to_input_events():
+    """Top-level seq is carried on input events and validated."""
+    event = decode('{"type": "key_up", "seq": 42, "data": {"key": "a", "code": "KeyA"}}')
+    assert event.seq == 42
+
+    with pytest.raises(DecodeError):
+        decode('{"type": "key_up", "seq": -1, "data": {"key": "a", "code": "KeyA"}}')
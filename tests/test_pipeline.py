@@ -0,0 +1,82 @@
+"""Unit tests for the event-processing pipeline."""
+
+import pytest
+from whip.pipeline import FilterStage, Pipeline, RateLimitStage, TransformStage, build_default_pipeline
+from whip.protocol import KeyDown, KeyUp, MessageType, MouseDown, MouseMove
+
+
+@pytest.mark.asyncio
+async def test_default_pipeline_suppresses_browser_repeat(controller):
+    """Repeated key_down for a held key is dropped before injection."""
+    pipeline = build_default_pipeline(controller)
+
+    assert await pipeline.process(KeyDown(key="a", code="KeyA")) is True
+    assert await pipeline.process(KeyDown(key="a", code="KeyA")) is False
+    assert await pipeline.process(KeyUp(key="a", code="KeyA")) is True
+
+    assert controller.calls == [("key_down", "a"), ("key_up", "a")]
+    stats = pipeline.stats()
+    assert stats["key_repeat_filter"]["calls"] == 3
+    assert stats["key_repeat_filter"]["dropped"] == 1
+    assert stats["inject_key_down"]["calls"] == 1
+
+
+@pytest.mark.asyncio
+async def test_custom_stages_run_in_order_before_injection(controller):
+    """Stages inserted before injection can transform and filter events."""
+    pipeline = build_default_pipeline(controller)
+
+    mirror = TransformStage("mirror", lambda e: MouseMove(1.0 - e.x, e.y))
+    left_half_only = FilterStage("left_half_only", lambda e: e.x <= 0.5)
+    pipeline.add_stage(mirror, MessageType.MOUSE_MOVE, before="inject_mouse_move")
+    pipeline.add_stage(left_half_only, MessageType.MOUSE_MOVE, before="inject_mouse_move")
+
+    assert pipeline.stages(MessageType.MOUSE_MOVE) == ["mirror", "left_half_only", "inject_mouse_move"]
+
+    await pipeline.process(MouseMove(0.75, 0.5))  # Mirrored to 0.25: passes
+    await pipeline.process(MouseMove(0.25, 0.5))  # Mirrored to 0.75: dropped
+
+    assert controller.calls == [("move", 0.25, 0.5)]
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_stage():
+    """Events faster than the limit are dropped."""
+    pipeline = Pipeline()
+    pipeline.add_stage(RateLimitStage("limit", max_rate=1.0), MessageType.MOUSE_MOVE)
+
+    assert await pipeline.process(MouseMove(0.1, 0.1)) is True
+    assert await pipeline.process(MouseMove(0.2, 0.2)) is False
+    assert pipeline.stats()["limit"]["dropped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dropped_key_not_recorded_as_held(controller):
+    """A key_down dropped by a site stage before injection isn't tracked as held."""
+    keys_pressed = set()
+    pipeline = build_default_pipeline(controller, keys_pressed=keys_pressed)
+    pipeline.add_stage(FilterStage("block_q", lambda e: e.key != "q"), MessageType.KEY_DOWN,
+                       before="inject_key_down")
+
+    assert await pipeline.process(KeyDown(key="q", code="KeyQ")) is False
+    assert keys_pressed == set()
+
+    assert await pipeline.process(KeyDown(key="a", code="KeyA")) is True
+    assert keys_pressed == {"a"}
+
+
+@pytest.mark.asyncio
+async def test_failed_mouse_down_not_recorded_as_held(controller, monkeypatch):
+    """A mouse_down whose injection raises isn't tracked as a held button."""
+
+    def mouse_down(button, x, y):
+        raise RuntimeError("injection failed")
+
+    monkeypatch.setattr(controller, "mouse_down", mouse_down)
+    buttons_held = set()
+    pipeline = build_default_pipeline(controller, buttons_held=buttons_held)
+    assert pipeline.stages(MessageType.MOUSE_DOWN) == ["inject_mouse_down", "mouse_button_tracker"]
+
+    with pytest.raises(RuntimeError):
+        await pipeline.process(MouseDown(button="left", x=0.5, y=0.5))
+    assert buttons_held == set()
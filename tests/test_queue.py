@@ -2,7 +2,7 @@
 
 import pytest
 from whip.queue import EventQueue
-from whip.protocol import MessageType
+from whip.protocol import KeyDown, KeyUp, MessageType, MouseDown, MouseMove, MouseUp
 
 
 @pytest.mark.asyncio
@@ -10,14 +10,14 @@ async def test_mouse_dedup_keeps_only_latest():
     """Multiple mouse moves should keep only the latest position."""
     q = EventQueue()
 
-    await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": 0, "y": 0}})
-    await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": 50, "y": 50}})
-    await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": 100, "y": 100}})
+    await q.put(MouseMove(x=0, y=0))
+    await q.put(MouseMove(x=50, y=50))
+    await q.put(MouseMove(x=100, y=100))
 
     # Should only get the latest position
     event = await q.get()
-    assert event["data"]["x"] == 100
-    assert event["data"]["y"] == 100
+    assert event.x == 100
+    assert event.y == 100
 
     # Queue should be empty now
     assert await q.get() is None
@@ -28,10 +28,10 @@ async def test_keyboard_fifo_order():
     """Keyboard events must preserve exact order."""
     q = EventQueue()
 
-    await q.put({"type": MessageType.KEY_DOWN, "data": {"key": "a"}})
-    await q.put({"type": MessageType.KEY_DOWN, "data": {"key": "b"}})
-    await q.put({"type": MessageType.KEY_UP, "data": {"key": "a"}})
-    await q.put({"type": MessageType.KEY_UP, "data": {"key": "b"}})
+    await q.put(KeyDown(key="a", code=""))
+    await q.put(KeyDown(key="b", code=""))
+    await q.put(KeyUp(key="a", code=""))
+    await q.put(KeyUp(key="b", code=""))
 
     # Must get exact order
     e1 = await q.get()
@@ -39,10 +39,10 @@ async def test_keyboard_fifo_order():
     e3 = await q.get()
     e4 = await q.get()
 
-    assert e1["data"]["key"] == "a" and e1["type"] == MessageType.KEY_DOWN
-    assert e2["data"]["key"] == "b" and e2["type"] == MessageType.KEY_DOWN
-    assert e3["data"]["key"] == "a" and e3["type"] == MessageType.KEY_UP
-    assert e4["data"]["key"] == "b" and e4["type"] == MessageType.KEY_UP
+    assert e1.key == "a" and e1.type == MessageType.KEY_DOWN
+    assert e2.key == "b" and e2.type == MessageType.KEY_DOWN
+    assert e3.key == "a" and e3.type == MessageType.KEY_UP
+    assert e4.key == "b" and e4.type == MessageType.KEY_UP
 
 
 @pytest.mark.asyncio
@@ -51,11 +51,11 @@ async def test_keyboard_never_dropped():
     q = EventQueue()
 
     # Simulate: mouse move, key down, many mouse moves, key up
-    await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": 0, "y": 0}})
-    await q.put({"type": MessageType.KEY_DOWN, "data": {"key": "x"}})
+    await q.put(MouseMove(x=0, y=0))
+    await q.put(KeyDown(key="x", code=""))
     for i in range(100):
-        await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": i, "y": i}})
-    await q.put({"type": MessageType.KEY_UP, "data": {"key": "x"}})
+        await q.put(MouseMove(x=i, y=i))
+    await q.put(KeyUp(key="x", code=""))
 
     # Drain queue, counting keyboard events
     keyboard_events = []
@@ -63,13 +63,13 @@ async def test_keyboard_never_dropped():
         event = await q.get()
         if event is None:
             break
-        if event["type"] in (MessageType.KEY_DOWN, MessageType.KEY_UP):
+        if event.type in (MessageType.KEY_DOWN, MessageType.KEY_UP):
             keyboard_events.append(event)
 
     # Both keyboard events must be present
     assert len(keyboard_events) == 2
-    assert keyboard_events[0]["type"] == MessageType.KEY_DOWN
-    assert keyboard_events[1]["type"] == MessageType.KEY_UP
+    assert keyboard_events[0].type == MessageType.KEY_DOWN
+    assert keyboard_events[1].type == MessageType.KEY_UP
 
 
 @pytest.mark.asyncio
@@ -77,15 +77,15 @@ async def test_mixed_events_order():
     """Mouse flush happens before keyboard, preserving logical order."""
     q = EventQueue()
 
-    await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": 10, "y": 10}})
-    await q.put({"type": MessageType.KEY_DOWN, "data": {"key": "k"}})
+    await q.put(MouseMove(x=10, y=10))
+    await q.put(KeyDown(key="k", code=""))
 
     # Mouse should come first (flushed when keyboard arrived)
     e1 = await q.get()
     e2 = await q.get()
 
-    assert e1["type"] == MessageType.MOUSE_MOVE
-    assert e2["type"] == MessageType.KEY_DOWN
+    assert e1.type == MessageType.MOUSE_MOVE
+    assert e2.type == MessageType.KEY_DOWN
 
 
 @pytest.mark.asyncio
@@ -95,11 +95,68 @@ async def test_backlog_size():
 
     assert q.backlog_size == 0
 
-    await q.put({"type": MessageType.MOUSE_MOVE, "data": {"x": 0, "y": 0}})
+    await q.put(MouseMove(x=0, y=0))
     assert q.backlog_size == 1  # Pending mouse
 
-    await q.put({"type": MessageType.KEY_DOWN, "data": {"key": "a"}})
+    await q.put(KeyDown(key="a", code=""))
     assert q.backlog_size == 2  # Flushed mouse + keyboard
 
     await q.get()  # Remove one
     assert q.backlog_size == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_events_before_pending_mouse():
+    """A mouse move arriving after queued keys must not jump ahead of them."""
+    q = EventQueue()
+
+    await q.put(KeyDown(key="a", code=""))
+    await q.put(MouseMove(x=0.5, y=0.5))
+
+    e1 = await q.get()
+    e2 = await q.get()
+
+    assert e1.type == MessageType.KEY_DOWN
+    assert e2.type == MessageType.MOUSE_MOVE
+
+
+@pytest.mark.asyncio
+async def test_drag_keeps_path_shape():
+    """Moves during a drag are simplified, not collapsed to the latest point."""
+    q = EventQueue(drag_tolerance=2.0, screen_size=(1000, 1000))
+
+    await q.put(MouseDown(button="left", x=0.0, y=0.0))
+    # L-shaped drag: right along the top, then down
+    for i in range(1, 11):
+        await q.put(MouseMove(x=i / 10, y=0.0))
+    for i in range(1, 11):
+        await q.put(MouseMove(x=1.0, y=i / 10))
+    await q.put(MouseUp(button="left", x=1.0, y=1.0))
+
+    events = []
+    while (event := await q.get()) is not None:
+        events.append(event)
+
+    moves = [(e.x, e.y) for e in events if isinstance(e, MouseMove)]
+    assert events[0].type == MessageType.MOUSE_DOWN
+    assert events[-1].type == MessageType.MOUSE_UP
+    # Only the corner and the end survive simplification
+    assert moves == [(1.0, 0.0), (1.0, 1.0)]
+
+
+@pytest.mark.asyncio
+async def test_hover_dedup_resumes_after_drag():
+    """After the button is released, moves are deduplicated again."""
+    q = EventQueue()
+
+    await q.put(MouseDown(button="left", x=0.0, y=0.0))
+    await q.put(MouseUp(button="left", x=0.0, y=0.0))
+    await q.get()
+    await q.get()
+
+    for i in range(10):
+        await q.put(MouseMove(x=i / 10, y=0.5))
+
+    assert q.backlog_size == 1
+    event = await q.get()
+    assert event.x == 0.9
@@ -0,0 +1,157 @@
+"""Unit tests for Session resource reclamation on disconnect."""
+
+import asyncio
+import time
+
+import pytest
+from whip.pipeline import FilterStage
+from whip.protocol import KeyDown, MessageType, MouseDown, MouseMove
+from whip.session import Session
+
+
+class FakeWebSocket:
+    """Stand-in WebSocket that discards outgoing messages."""
+
+    async def send_json(self, message):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_close_releases_held_input(controller):
+    """Held keys and buttons are released and repeats stop on close."""
+    session = Session(FakeWebSocket(), controller)
+    session.start()
+
+    await session.queue.put(KeyDown(key="a", code="KeyA"))
+    await session.queue.put(MouseDown(button="left", x=0.5, y=0.5))
+    while session.queue.has_pending:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.01)
+
+    assert session.keys_pressed == {"a"}
+    assert session.buttons_held == {"left"}
+    assert session.repeat_manager is not None and session.repeat_manager.repeating == {"a"}
+
+    await session.close()
+
+    assert ("key_up", "a") in controller.calls
+    assert ("mouse_up", "left", None, None) in controller.calls
+    assert session.repeat_manager.repeating == set()
+    assert not session.keys_pressed and not session.buttons_held
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_queue_and_is_idempotent(controller):
+    """Queued events are discarded, and closing twice is harmless."""
+    session = Session(FakeWebSocket(), controller)
+
+    await session.queue.put(MouseMove(x=0.1, y=0.1))
+    await session.queue.put(KeyDown(key="b", code="KeyB"))
+
+    await session.close()
+    await session.close()
+
+    assert session.closed
+    assert not session.queue.has_pending
+
+
+@pytest.mark.asyncio
+async def test_stale_move_dropped_only_when_superseded(controller):
+    """A stale move is dropped for a newer move but kept if it is the newest."""
+    session = Session(FakeWebSocket(), controller)
+
+    await session.submit(MouseMove(x=0.1, y=0.1), stale=True)
+    await session.submit(MouseMove(x=0.2, y=0.2), stale=True)
+    assert session.has_held_move
+    assert not session.queue.has_pending
+
+    # Burst over: the newest stale move is injected rather than lost
+    await session.flush_held_move()
+    event = await session.queue.get()
+    assert (event.x, event.y) == (0.2, 0.2)
+    assert session.latency.stale_moves == 2
+    assert session.latency.stale_dropped == 1
+
+
+@pytest.mark.asyncio
+async def test_held_stale_move_queued_before_other_events(controller):
+    """Non-move events flush the held stale move first, preserving order."""
+    session = Session(FakeWebSocket(), controller)
+
+    await session.submit(MouseMove(x=0.3, y=0.3), stale=True)
+    await session.submit(KeyDown(key="a", code="KeyA"))
+
+    assert isinstance(await session.queue.get(), MouseMove)
+    assert isinstance(await session.queue.get(), KeyDown)
+    assert not session.has_held_move
+
+
+def test_latency_stats_reported(controller):
+    """Recorded delays appear in the session stats."""
+    session = Session(FakeWebSocket(), controller)
+    session.latency.record(10.0)
+    session.latency.record(30.0)
+
+    latency = session.stats()["latency"]
+    assert latency["samples"] == 2
+    assert latency["mean_delay_ms"] == 20.0
+    assert latency["max_delay_ms"] == 30.0
+
+
+@pytest.mark.asyncio
+async def test_stale_moves_kept_during_drag(controller):
+    """Stale moves while a button is held reach the drag path."""
+    session = Session(FakeWebSocket(), controller)
+
+    await session.submit(MouseDown(button="left", x=0.0, y=0.0))
+    await session.submit(MouseMove(x=0.5, y=0.0), stale=True)
+    await session.submit(MouseMove(x=0.5, y=0.5), stale=True)
+    assert not session.has_held_move
+
+    events = []
+    while (event := await session.queue.get()) is not None:
+        events.append(event)
+    assert [(e.x, e.y) for e in events if isinstance(e, MouseMove)] == [(0.5, 0.0), (0.5, 0.5)]
+    assert session.latency.stale_dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_configure_pipeline_adds_site_stages(controller):
+    """The configure_pipeline hook can insert stages into the session pipeline."""
+
+    def configure(pipeline):
+        pipeline.add_stage(
+            FilterStage("block_q", lambda e: e.key != "q"), MessageType.KEY_DOWN, before="inject_key_down"
+        )
+
+    session = Session(FakeWebSocket(), controller, configure_pipeline=configure)
+    assert "block_q" in session.pipeline.stages(MessageType.KEY_DOWN)
+
+    assert await session.pipeline.process(KeyDown(key="q", code="KeyQ")) is False
+    assert ("key_down", "q") not in controller.calls
+    assert session.keys_pressed == set()
+    await session.close()
+    assert ("key_up", "q") not in controller.calls
+
+
+@pytest.mark.asyncio
+async def test_close_waits_for_in_flight_injection(controller, monkeypatch):
+    """A press still running in the executor completes before its release."""
+    key_down = controller.key_down
+
+    def slow_key_down(key, code):
+        time.sleep(0.2)  # Blocks in the executor for a while
+        key_down(key, code)
+
+    monkeypatch.setattr(controller, "key_down", slow_key_down)
+    session = Session(FakeWebSocket(), controller)
+    session.start()
+
+    await session.queue.put(KeyDown(key="a", code="KeyA"))
+    while session.queue.has_pending:
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)  # key_down is now sleeping in the executor
+
+    await session.close()
+
+    assert controller.calls.index(("key_down", "a")) < controller.calls.index(("key_up", "a"))
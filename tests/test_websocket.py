@@ -0,0 +1,172 @@
+"""Integration tests for websocket_endpoint on the null input backend."""
+
+import logging
+import os
+import time
+
+import pytest
+
+import whip.main
+from whip.loadtest import run_load_test
+from whip.pipeline import FilterStage
+from whip.protocol import MessageType
+
+
+def receive_type(ws, msg_type):
+    """Receive messages until one of the given type arrives (skipping pings/cursor)."""
+    while True:
+        message = ws.receive_json()
+        if message["type"] == msg_type:
+            return message
+
+
+def wait_for_count(name, expected, timeout=2.0):
+    """Wait until the null backend has recorded an operation."""
+    deadline = time.monotonic() + timeout
+    while whip.main.input_controller.counts[name] < expected:
+        assert time.monotonic() < deadline, f"{name} never reached {expected}"
+        time.sleep(0.01)
+
+
+def test_input_event_is_acked_and_injected(client):
+    """Valid input events are acked and reach the backend."""
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "mouse_move", "data": {"x": 0.5, "y": 0.5}})
+        ack = receive_type(ws, "ack")
+        assert ack["received"] == "mouse_move"
+        wait_for_count("move_mouse", 1)
+
+
+def test_malformed_frame_rejected_without_disconnect(client):
+    """Invalid frames get an error reply and the connection stays usable."""
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "mouse_move", "data": {"x": 7, "y": 0.5}})
+        error = receive_type(ws, "error")
+        assert "out of range" in error["data"]["message"]
+
+        ws.send_json({"type": "echo", "data": {"message": "still here"}})
+        assert receive_type(ws, "echo")["data"]["message"] == "still here"
+
+
+def test_disconnect_releases_held_key(client):
+    """A key held when the socket drops is released on the host."""
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "key_down", "data": {"key": "a", "code": "KeyA"}})
+        receive_type(ws, "ack")
+        wait_for_count("key_down", 1)
+
+    wait_for_count("key_up", 1)
+    assert client.get("/stats").json()["sessions"] == {}
+
+
+@pytest.mark.asyncio
+async def test_load_test_smoke(monkeypatch):
+    """A short multi-client run completes with every event acked."""
+    monkeypatch.delenv("WHIP_BACKEND", raising=False)
+    root_level = logging.getLogger().level
+    report = await run_load_test(clients=2, rate=50, duration=1.0, sample_interval=0.5)
+
+    # The in-process server must not leak its settings into later tests
+    assert "WHIP_BACKEND" not in os.environ
+    assert logging.getLogger().level == root_level
+    assert report["metrics_scope"] == "server"
+
+    assert report["sent"] > 0
+    assert report["acked"] == report["sent"]
+    assert report["errors"] == 0 and report["disconnects"] == 0
+    assert report["ack_latency_ms"]["count"] == report["acked"]
+    assert report["memory"]["samples"]
+
+
+def test_resume_dedups_replayed_events(client):
+    """Reconnecting with the session token resumes the sequence numbers."""
+    with client.websocket_connect("/ws") as ws:
+        session = receive_type(ws, "session")["data"]
+        assert session["resumed"] is False
+
+        ws.send_json({"type": "mouse_move", "seq": 1, "data": {"x": 0.1, "y": 0.1}})
+        assert receive_type(ws, "ack")["seq"] == 1
+        wait_for_count("move_mouse", 1)
+
+    with client.websocket_connect(f"/ws?session={session['token']}") as ws:
+        resumed = receive_type(ws, "session")["data"]
+        assert resumed == {"token": session["token"], "last_seq": 1, "resumed": True}
+
+        # Client replays everything it has not seen acked
+        ws.send_json({"type": "mouse_move", "seq": 1, "data": {"x": 0.1, "y": 0.1}})
+        assert receive_type(ws, "ack")["duplicate"] is True
+
+        ws.send_json({"type": "mouse_move", "seq": 2, "data": {"x": 0.2, "y": 0.2}})
+        ack = receive_type(ws, "ack")
+        assert ack["seq"] == 2 and "duplicate" not in ack
+
+
+def test_configure_pipeline_hook_applies_to_sessions(client, monkeypatch):
+    """whip.main.configure_pipeline customizes every new session's pipeline."""
+    def configure(pipeline):
+        pipeline.add_stage(FilterStage("no_moves", lambda e: False), MessageType.MOUSE_MOVE)
+
+    monkeypatch.setattr(whip.main, "configure_pipeline", configure)
+    with client.websocket_connect("/ws") as ws:
+        session = next(iter(whip.main.manager.sessions.values()))
+        assert "no_moves" in session.pipeline.stages(MessageType.MOUSE_MOVE)
+        ws.send_json({"type": "echo", "data": {}})
+        receive_type(ws, "echo")
+
+
+def test_resume_point_excludes_unprocessed_events(client):
+    """Events acked but discarded from the queue on disconnect are replayed, not deduped."""
+    with client.websocket_connect("/ws") as ws:
+        token = receive_type(ws, "session")["data"]["token"]
+        session = whip.main.manager.sessions[token]
+        session.processed_seq = 0
+        session._stopping = True  # Consumer stops before injecting anything else
+
+        ws.send_json({"type": "key_down", "seq": 1, "data": {"key": "a", "code": "KeyA"}})
+        ack = receive_type(ws, "ack")
+        assert ack["seq"] == 1 and ack["processed"] == 0
+
+    with client.websocket_connect(f"/ws?session={token}") as ws:
+        resumed = receive_type(ws, "session")["data"]
+        assert resumed["resumed"] is True and resumed["last_seq"] == 0
+
+        ws.send_json({"type": "key_down", "seq": 1, "data": {"key": "a", "code": "KeyA"}})
+        assert "duplicate" not in receive_type(ws, "ack")
+        wait_for_count("key_down", 1)
+
+
+def test_resume_represses_held_modifier(client):
+    """A modifier held when the connection drops is pressed again on resume."""
+    with client.websocket_connect("/ws") as ws:
+        token = receive_type(ws, "session")["data"]["token"]
+        ws.send_json({"type": "key_down", "seq": 1, "data": {"key": "Shift", "code": "ShiftLeft"}})
+        receive_type(ws, "ack")
+        wait_for_count("key_down", 1)
+
+    # Released on disconnect so it can't stay stuck...
+    wait_for_count("key_up", 1)
+
+    with client.websocket_connect(f"/ws?session={token}") as ws:
+        receive_type(ws, "session")
+        # ...and held again once the client is back
+        wait_for_count("key_down", 2)
+        assert whip.main.manager.sessions[token].keys_pressed == {"Shift"}
+
+
+def test_resume_represses_held_button(client):
+    """A drag interrupted by a dropped connection continues after resume."""
+    with client.websocket_connect("/ws") as ws:
+        token = receive_type(ws, "session")["data"]["token"]
+        ws.send_json({"type": "mouse_down", "seq": 1, "data": {"button": "left", "x": 0.25, "y": 0.5}})
+        receive_type(ws, "ack")
+        wait_for_count("mouse_down", 1)
+
+    wait_for_count("mouse_up", 1)
+
+    with client.websocket_connect(f"/ws?session={token}") as ws:
+        receive_type(ws, "session")
+        wait_for_count("mouse_down", 2)
+        session = whip.main.manager.sessions[token]
+        assert session.buttons_held == {"left"}
+        assert session.queue.dragging
+        assert whip.main.input_controller.get_position() == (0.25, 0.5)